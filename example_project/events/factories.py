@@ -0,0 +1,25 @@
+from django.utils.text import slugify
+
+import factory
+
+from .models import Event, Venue
+
+
+class VenueFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Venue
+
+    name = factory.Sequence(lambda n: f'venue{n:0>3}')
+
+
+class EventFactory(factory.django.DjangoModelFactory):
+
+    class Meta:
+        model = Event
+
+    # Create some dummy default values for the title (which has to be unique).
+    title = factory.Sequence(lambda n: f'event{n:0>3}')
+    slug = factory.LazyAttribute(lambda a: slugify(f'{a.title}'))
+    status = Event.STATUS.published
+    venue = factory.SubFactory(VenueFactory)
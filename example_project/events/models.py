@@ -0,0 +1,19 @@
+from django.db import models
+
+from minipub.models import MinipubDateTimeModel
+
+
+class Venue(models.Model):
+    name = models.CharField(max_length=50)
+
+    def __str__(self):
+        return self.name
+
+
+class Event(MinipubDateTimeModel):
+    title = models.CharField(unique=True, max_length=50)
+    slug = models.SlugField()
+    venue = models.ForeignKey(Venue, null=True, blank=True, on_delete=models.SET_NULL, related_name='events')
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,215 @@
+import datetime
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sites.models import Site
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from django.views.generic import ListView
+
+from minipub import caching
+from minipub.scheduler import get_last_run, tick
+from minipub.sitemaps import MinipubSitemap
+from minipub.testing import QueryCountTestMixin
+from minipub.views import CacheControlMixin, GetQuerysetMixin, KeysetPaginationMixin, MinipubArchiveIndexView
+
+from .factories import EventFactory
+from .models import Event
+
+"""
+Tests for a model with start and end times.
+
+"""
+
+
+class EventModelTest(TestCase):
+
+    def setUp(self):
+        self.now = Event.minipub_now()
+        self.event1 = EventFactory(title='Started', start=self.now - datetime.timedelta(minutes=1))
+
+    def test_now(self):
+        """The current time is rounded down to the minute."""
+
+        self.assertEqual(self.now.second, 0)
+        self.assertEqual(self.now.microsecond, 0)
+        self.assertTrue(timezone.is_aware(self.now))
+
+    def test_save(self):
+        """Start and end times are rounded down to the minute; the start time defaults to now."""
+
+        event = EventFactory(start=datetime.datetime(2026, 3, 1, 9, 0, 42, 123, tzinfo=datetime.timezone.utc),
+                             end=datetime.datetime(2026, 3, 1, 17, 29, 59, tzinfo=datetime.timezone.utc))
+        self.assertEqual(event.start, datetime.datetime(2026, 3, 1, 9, 0, tzinfo=datetime.timezone.utc))
+        self.assertEqual(event.end, datetime.datetime(2026, 3, 1, 17, 29, tzinfo=datetime.timezone.utc))
+
+        event = EventFactory()
+        self.assertGreaterEqual(event.start, self.now)
+
+        with mock.patch.object(Event, 'minipub_resolution', datetime.timedelta(minutes=15)):
+            self.assertEqual(Event.minipub_round(datetime.datetime(2026, 3, 1, 9, 29, tzinfo=datetime.timezone.utc)),
+                             datetime.datetime(2026, 3, 1, 9, 15, tzinfo=datetime.timezone.utc))
+
+    def test_live(self):
+        """Events are live between their start and end times."""
+
+        EventFactory(title='Later', start=self.now + datetime.timedelta(minutes=1))
+        EventFactory(title='Ended', start=self.now - datetime.timedelta(hours=1),
+                     end=self.now - datetime.timedelta(minutes=1))
+        ends_now = EventFactory(title='Ends now', end=self.now)
+        self.assertQuerySetEqual(Event.objects.live().order_by('title'),
+                                 ['<Event: Ends now>', '<Event: Started>'], transform=repr)
+        self.assertTrue(ends_now.live())
+        self.assertEqual([event.title for event in Event.objects.with_live().filter(is_live=True).order_by('title')],
+                         ['Ends now', 'Started'])
+
+    def test_next_boundary(self):
+        """The next boundary is a time."""
+
+        self.assertIsNone(Event.objects.next_boundary())
+
+        EventFactory(end=self.now + datetime.timedelta(minutes=30))
+        self.assertEqual(Event.objects.next_boundary(), self.now + datetime.timedelta(minutes=31))
+
+        EventFactory(start=self.now + datetime.timedelta(minutes=10))
+        self.assertEqual(Event.objects.next_boundary(), self.now + datetime.timedelta(minutes=10))
+
+        view = CacheControlMixin()
+        view.model = Event
+        self.assertLessEqual(view.get_cache_timeout(), 10 * 60)
+        self.assertGreater(view.get_cache_timeout(), 9 * 60 - 10)
+
+    def test_live_counts(self):
+        """Counts can be asked for on dates or times."""
+
+        day = datetime.date(2020, 3, 1)
+        midnight = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+        EventFactory(start=midnight - datetime.timedelta(hours=2), end=midnight + datetime.timedelta(hours=1))
+        EventFactory(start=midnight + datetime.timedelta(hours=2))
+        later = midnight + datetime.timedelta(hours=3)
+        counts = Event.objects.live_counts([later, day, midnight + datetime.timedelta(hours=1, minutes=1)])
+        self.assertEqual(counts, {day: 1, midnight + datetime.timedelta(hours=1, minutes=1): 0, later: 1})
+
+    def test_cache_key(self):
+        """Cache keys change every minute."""
+
+        self.assertIn(self.now.isoformat(), caching.make_key(Event, 'test'))
+        later = self.now + datetime.timedelta(minutes=1)
+        with mock.patch.object(Event, 'minipub_now', return_value=later):
+            self.assertIn(later.isoformat(), caching.make_key(Event, 'test'))
+            # The event that starts in a minute is live then.
+            event2 = EventFactory(start=later)
+            self.assertEqual(len(Event.objects.live_cached()), 2)
+            self.assertTrue(event2.live())
+        self.assertEqual(len(Event.objects.live_cached()), 1)
+
+    def test_scheduler(self):
+        """The scheduler accepts a start date."""
+
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.settings(MINIPUB_SCHEDULER_STATE=os.path.join(tmp, 'scheduler.json')):
+                self.assertEqual(tick(Event, since=yesterday), (1, 0))
+                self.assertIsInstance(get_last_run(Event), datetime.datetime)
+                self.assertEqual(tick(Event), (0, 0))
+
+
+class EventList(GetQuerysetMixin, ListView):
+    model = Event
+    minipub_select_related = ('venue',)
+
+
+class EventSitemap(MinipubSitemap):
+    model = Event
+    minipub_select_related = ('venue',)
+    minipub_only_fields = ('slug', 'venue__name')
+
+    def location(self, obj):
+        return f'/{obj.venue.name}/{obj.slug}/'
+
+
+class RelatedObjectsTest(QueryCountTestMixin, TestCase):
+    """Related objects are fetched along with the events."""
+
+    def setUp(self):
+        EventFactory.create_batch(5, start=Event.minipub_now() - datetime.timedelta(days=1))
+        EventFactory(status=Event.STATUS.draft)
+
+    def get_venues(self, view_class, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        view = view_class()
+        view.setup(request)
+        return [event.venue.name for event in view.get_queryset()]
+
+    def test_select_related(self):
+        """Both public and staff pages use select_related()."""
+
+        with self.assertMaxQueries(1):
+            self.assertEqual(len(self.get_venues(EventList, AnonymousUser())), 5)
+        staff = User.objects.create_user('john.doe', is_staff=True)
+        with self.assertMaxQueries(1):
+            self.assertEqual(len(self.get_venues(EventList, staff)), 6)
+
+    def test_prefetch_related(self):
+
+        class View(EventList):
+            minipub_select_related = None
+            minipub_prefetch_related = ('venue',)
+
+        with self.assertMaxQueries(2):
+            self.assertEqual(len(self.get_venues(View, AnonymousUser())), 5)
+
+    def test_only_fields(self):
+        """Only the fields listed, plus those used by minipub, are loaded."""
+
+        class View(EventList):
+            minipub_only_fields = ('slug', 'venue__name')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        view = View()
+        view.setup(request)
+        event = view.get_queryset().first()
+        self.assertEqual(event.get_deferred_fields(), {'title', 'created', 'status_changed'})
+
+    def test_sitemap(self):
+        """The sitemap does not query the venue of each event."""
+
+        with self.assertMaxQueries(2):
+            urls = EventSitemap().get_urls(site=Site(domain='example.com'), protocol='http')
+        self.assertEqual(len(urls), 5)
+
+    def test_max_queries(self):
+        """The helper reports the queries when there are too many."""
+
+        with self.assertRaisesMessage(AssertionError, '6 queries executed, at most 1 expected'):
+            with self.assertMaxQueries(1):
+                [event.venue.name for event in Event.objects.live()]
+
+
+class EventArchive(KeysetPaginationMixin, MinipubArchiveIndexView):
+    model = Event
+    paginate_by = 2
+
+
+class KeysetPaginationTest(TestCase):
+    """Cursors on start times can be used in urls."""
+
+    def test_pages(self):
+        start = datetime.datetime(2026, 3, 1, 9, 46, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+        for n in range(5):
+            EventFactory(title=f'event {n}', start=start - datetime.timedelta(minutes=n))
+        pages = []
+        url = '/events/'
+        while url:
+            request = RequestFactory().get(url)
+            request.user = AnonymousUser()
+            response = EventArchive.as_view()(request)
+            pages.append([event.title for event in response.context_data['object_list']])
+            cursor = response.context_data['next_cursor']
+            # As in the documented template: ?after={{ next_cursor }}
+            url = f'/events/?after={cursor}' if cursor else None
+        self.assertEqual(pages, [['event 0', 'event 1'], ['event 2', 'event 3'], ['event 4']])
@@ -29,6 +29,8 @@ INSTALLED_APPS = (
     'minipub',
     'news',
     'news_with_archive',
+    'news_live_flag',
+    'events',
 )
 
 MIDDLEWARE = (
@@ -73,6 +75,23 @@ DATABASES = {
     }
 }
 
+# The benchmarks (``python manage.py benchmark``) can also be run against a local
+# Postgres database, e.g. ``MINIPUB_DATABASE=postgres PGUSER=... python manage.py benchmark``.
+# This requires psycopg to be installed.
+if os.environ.get('MINIPUB_DATABASE') == 'postgres':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('PGDATABASE', 'minipub'),
+        'USER': os.environ.get('PGUSER', ''),
+        'PASSWORD': os.environ.get('PGPASSWORD', ''),
+        'HOST': os.environ.get('PGHOST', 'localhost'),
+        'PORT': os.environ.get('PGPORT', ''),
+    }
+
+# A stand-in for a read replica, to try out minipub's database routing (see
+# ``MINIPUB_READ_REPLICA``): it is just another connection to the same database.
+DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-us'
@@ -94,4 +113,11 @@ STATICFILES_DIRS = (
 
 SITE_ID = 1
 
+# Sitemaps pre-built by the minipub_build_sitemaps command.
+MINIPUB_SITEMAPS = 'example_project.urls.sitemaps'
+MINIPUB_SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+
+# The last run of the minipub_scheduler command.
+MINIPUB_SCHEDULER_STATE = os.path.join(BASE_DIR, 'minipub_scheduler.json')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -1,8 +1,10 @@
 from django.urls import include, path
 from django.contrib import admin
-from django.contrib.sitemaps.views import sitemap
+from django.contrib.sitemaps.views import index, sitemap
 from django.views.generic import TemplateView
 
+from minipub.sitemaps import prebuilt_sitemap, prebuilt_sitemap_index
+
 from news.sitemaps import NewsSitemap
 from news_with_archive.sitemaps import NewsPublishedSitemap, NewsArchivedSitemap
 
@@ -17,9 +19,17 @@ urlpatterns = [
         template_name="homepage.html"), name='homepage'),
 ]
 
+sitemaps = {'news': NewsSitemap,
+            'published': NewsPublishedSitemap,
+            'archived': NewsArchivedSitemap}
+
 urlpatterns += [
-    path('sitemap.xml', sitemap,
-         {'sitemaps': {'news': NewsSitemap,
-                       'published': NewsPublishedSitemap,
-                       'archived': NewsArchivedSitemap}})
+    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}),
+    # Large sites will want to split their sitemap into sections.
+    path('sitemap-index.xml', index, {'sitemaps': sitemaps}),
+    path('sitemap-<section>.xml', sitemap, {'sitemaps': sitemaps},
+         name='django.contrib.sitemaps.views.sitemap'),
+    # Sections written to disk by the minipub_build_sitemaps command.
+    path('prebuilt/sitemap.xml', prebuilt_sitemap_index),
+    path('prebuilt/sitemap-<slug:section>.xml', prebuilt_sitemap),
 ]
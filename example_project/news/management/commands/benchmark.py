@@ -0,0 +1,137 @@
+"""Benchmark the hot paths of minipub: live() queries, the views and the sitemaps.
+
+The benchmark runs against a throwaway test database, so it will not touch your
+development data. For example::
+
+    python manage.py benchmark --rows 1000 10000 100000
+
+By default the benchmark uses SQLite; to run it against a local Postgres database,
+set the ``MINIPUB_DATABASE`` environment variable - see ``settings.py``.
+
+Use ``--compare-index`` to also time ``live()`` without the minipub 'live' index.
+"""
+import datetime
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+
+from news.factories import ArticleFactory
+from news.models import Article
+from news.sitemaps import NewsSitemap
+from news_with_archive.factories import ArticleFactory as ArchiveArticleFactory
+from news_with_archive.models import Article as ArchiveArticle
+from news_with_archive.sitemaps import NewsArchivedSitemap
+
+
+def seed(factory, count, statuses, batch_size=5000):
+    """Create ``count`` articles: spread over 10 years, some of them with an end date."""
+    model = factory._meta.model
+    model.objects.all().delete()
+    today = datetime.date.today()
+    rng = random.Random(count)
+    batch = []
+    for n in range(count):
+        start = today - datetime.timedelta(days=rng.randint(-365, 3650))
+        end = start + datetime.timedelta(days=rng.randint(30, 730)) if rng.random() < 0.1 else None
+        batch.append(factory.build(title=f'article{n}', slug=f'article{n}', body='Lorem ipsum. ' * 100,
+                                   status=rng.choice(statuses), start=start, end=end))
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times; return the median time (in ms) and the number of queries."""
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            begin = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(timings), len(queries)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the minipub queries, views and sitemaps of the example project.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[1000, 10000],
+                            help='Table sizes to benchmark.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Number of timings to take (the median is reported).')
+        parser.add_argument('--compare-index', action='store_true',
+                            help="Also time live() without the minipub 'live' index.")
+
+    def handle(self, *args, **options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.staff = User.objects.create_user('staff', is_staff=True)
+            self.stdout.write(f'Database: {connection.vendor}')
+            for count in options['rows']:
+                self.benchmark(count, options['repeat'], options['compare_index'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def report(self, label, func, repeat):
+        median, queries = measure(func, repeat)
+        self.stdout.write(f'  {label:<45} {median:>10.2f} ms {queries:>5} queries')
+
+    def benchmark(self, count, repeat, compare_index):
+        self.stdout.write(f'Seeding {count} articles...')
+        seed(ArticleFactory, count, [Article.STATUS.draft, Article.STATUS.published])
+        seed(ArchiveArticleFactory, count, [status for status, _ in ArchiveArticle.STATUS])
+
+        self.stdout.write(f'{count} articles:')
+        self.report('news live().count()', lambda: Article.objects.live().count(), repeat)
+        self.report('news latest 10 live()', lambda: list(Article.objects.live().order_by('-start')[:10]), repeat)
+        self.report('news_with_archive archived latest 10 live()',
+                    lambda: list(ArchiveArticle.objects.live(statuses=['archived']).order_by('-start')[:10]), repeat)
+        if compare_index:
+            self.compare_index(repeat)
+
+        year = datetime.date.today().year - 1
+        slug = Article.objects.live().values_list('slug', flat=True).first()
+        urls = ['/news/', f'/news/year/{year}/', f'/news/{slug}/', '/news_with_archive/archived/']
+        anonymous = Client()
+        staff = Client()
+        staff.force_login(self.staff)
+        for url in urls:
+            self.report(f'GET {url} (anonymous)', lambda: anonymous.get(url), repeat)
+            self.report(f'GET {url} (staff)', lambda: staff.get(url), repeat)
+
+        site = Site(domain='example.com')
+        for sitemap in (NewsSitemap(), NewsArchivedSitemap()):
+            label = f'{type(sitemap).__name__} page 1'
+            self.report(label, lambda: sitemap.get_urls(page=1, site=site), repeat)
+            tracemalloc.start()
+            sitemap.get_urls(page=1, site=site)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.stdout.write(f'  {label + " memory peak":<45} {peak / 1024 / 1024:>10.2f} MB')
+
+    def compare_index(self, repeat):
+        index = next(index for index in Article._meta.indexes if index.name.endswith('_live'))
+        live = Article.objects.live()
+        self.explain('Query plan with index', live)
+        with connection.schema_editor() as editor:
+            editor.remove_index(Article, index)
+        self.report('news latest 10 live() without index', lambda: list(live.order_by('-start')[:10]), repeat)
+        self.explain('Query plan without index', live)
+        with connection.schema_editor() as editor:
+            editor.add_index(Article, index)
+
+    def explain(self, label, qs):
+        self.stdout.write(f'  {label}:')
+        for line in qs.explain().splitlines():
+            self.stdout.write(f'    {line}')
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0003_article_news_article_live'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleLog',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('status', models.PositiveSmallIntegerField()),
+                ('start', models.DateField(blank=True, null=True)),
+                ('end', models.DateField(blank=True, null=True)),
+                ('changed', models.DateTimeField()),
+            ],
+            options={
+                'abstract': False,
+                'indexes': [models.Index(fields=['object_id', 'changed'], name='news_articlelog_obj')],
+            },
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 from django.urls import reverse
 
-from minipub.models import MinipubModel
+from minipub.models import MinipubLogModel, MinipubModel
 
 
 class Article(MinipubModel):
@@ -9,8 +9,20 @@ class Article(MinipubModel):
     slug = models.SlugField()
     body = models.TextField()
 
+    minipub_log = 'news.ArticleLog'
+
+    class Meta(MinipubModel.Meta):
+        # The detail views look up a live article by slug: this index covers the whole query.
+        indexes = MinipubModel.Meta.indexes + [
+            models.Index(fields=['slug', 'status', 'start', 'end'], name='%(app_label)s_%(class)s_slug'),
+        ]
+
     def __str__(self):
         return self.title
 
     def get_absolute_url(self):
         return reverse('news:article_detail', kwargs={'slug': self.slug})
+
+
+class ArticleLog(MinipubLogModel):
+    pass
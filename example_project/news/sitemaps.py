@@ -5,3 +5,4 @@ from .models import Article
 
 class NewsSitemap(MinipubSitemap):
     model = Article
+    minipub_only_fields = ('slug',)
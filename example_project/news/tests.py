@@ -1,11 +1,39 @@
-from django.test import TestCase
-from django.core.exceptions import ValidationError
-from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.contrib.auth.models import AnonymousUser, Permission, User
+from django.contrib.sites.models import Site
+from django.core.management import CommandError, call_command
+from django.http import Http404
+from django.template import Context, Template
+from django.utils import timezone
+
+from minipub import caching
+from minipub.instrumentation import InstrumentationMixin
+from minipub.partitioning import create_partitions_sql
+from minipub.scheduler import get_last_run, tick
+from minipub.signals import instrumented, minipub_expired, minipub_went_live
+from minipub.testing import QueryCountTestMixin
+from minipub.views import (KeysetPaginationMixin, MinipubAsyncArchiveIndexView, MinipubAsyncDetailView,
+                           StaffPreview)
+
+from news_with_archive.models import Article as ArchiveArticle
 
 from .factories import ArticleFactory
-from .models import Article
+from .models import Article, ArticleLog
+from .sitemaps import NewsSitemap
+from .views import ArticleArchiveView, ArticleDetailView, ArticleYearArchiveView
 
+import asyncio
 import datetime
+import gzip
+import os
+import re
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
 """
 Welcome... here are all the tests for the minipub application.
@@ -88,6 +116,50 @@ class ArticleModelTest(TestCase):
 
         self.assertNotEqual(article.start, None)
 
+    def test_live_index(self):
+        """The fields used by live() are covered by an index inherited from MinipubModel."""
+
+        indexes = {index.name: index.fields for index in Article._meta.indexes}
+        self.assertEqual(indexes['news_article_live'], ['status', 'start', 'end'])
+
+    def test_with_live(self):
+        """Liveness can be computed by the database for a list of articles."""
+
+        ArticleFactory(title='draft', status=Article.STATUS.draft)
+        ArticleFactory(title='future', start=datetime.date(2999, 1, 1))
+        ArticleFactory(title='expired', end=datetime.date(1901, 1, 1))
+
+        articles = {article.title: article.is_live for article in Article.objects.with_live()}
+        self.assertEqual(articles, {'Some news about me': True, 'draft': False, 'future': False, 'expired': False})
+        for article in Article.objects.with_live():
+            self.assertEqual(article.is_live, article.live())
+
+        articles = {article.title: article.is_live for article in Article.objects.with_live(statuses=['draft'])}
+        self.assertEqual(articles['draft'], True)
+        self.assertEqual(articles['Some news about me'], False)
+
+        # Can be filtered and sorted on.
+        self.assertQuerySetEqual(Article.objects.with_live().filter(is_live=True),
+                                 ['<Article: Some news about me>'], transform=repr)
+
+    def test_next_boundary(self):
+        """Next date on which an article will go live or expire."""
+
+        today = datetime.date.today()
+        self.assertEqual(Article.objects.next_boundary(), None)
+
+        ArticleFactory(start=today + datetime.timedelta(days=10))
+        self.assertEqual(Article.objects.next_boundary(), today + datetime.timedelta(days=10))
+
+        # Live until the end of the end date.
+        ArticleFactory(end=today + datetime.timedelta(days=2))
+        self.assertEqual(Article.objects.next_boundary(), today + datetime.timedelta(days=3))
+        ArticleFactory(end=today)
+        self.assertEqual(Article.objects.next_boundary(), today + datetime.timedelta(days=1))
+
+        # Other statuses are ignored.
+        self.assertEqual(Article.objects.next_boundary(statuses=['draft']), None)
+
     def test_draft_preview(self):
         """Helper property: is article draft?"""
 
@@ -99,6 +171,158 @@ class ArticleModelTest(TestCase):
         self.assertEqual(self.article1.staff_preview, True)
 
 
+class ArticleBulkTest(TestCase):
+    """The status of many articles can be changed at once."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='article 1', start=None, status=Article.STATUS.draft)
+        self.article2 = ArticleFactory(title='article 2', start=datetime.date(2011, 12, 23),
+                                       status=Article.STATUS.draft)
+        self.article3 = ArticleFactory(title='article 3', start=datetime.date(2012, 12, 23))
+
+    def test_publish(self):
+        """Publishing sets the start date and the timestamps."""
+
+        # 1 UPDATE, plus a SELECT and an INSERT for the transition log.
+        with self.assertNumQueries(3):
+            self.assertEqual(Article.objects.all().publish(), 2)
+
+        self.assertQuerySetEqual(Article.objects.live().order_by('title'),
+                                 ['<Article: article 1>', '<Article: article 2>', '<Article: article 3>'],
+                                 transform=repr)
+        article1 = Article.objects.get(pk=self.article1.pk)
+        self.assertEqual(article1.start, datetime.date.today())
+        self.assertGreater(article1.status_changed, self.article1.status_changed)
+        self.assertGreater(article1.modified, self.article1.modified)
+        article2 = Article.objects.get(pk=self.article2.pk)
+        self.assertEqual(article2.start, datetime.date(2011, 12, 23))
+
+        # Articles that were already published are not changed.
+        article3 = Article.objects.get(pk=self.article3.pk)
+        self.assertEqual(article3.status_changed, self.article3.status_changed)
+        self.assertEqual(article3.modified, self.article3.modified)
+
+    def test_publish_no_start(self):
+        """The queryset can filter on the start date that publishing sets."""
+
+        self.assertEqual(Article.objects.filter(start__isnull=True).publish(), 1)
+        article1 = Article.objects.get(pk=self.article1.pk)
+        self.assertEqual(article1.status, Article.STATUS.published)
+        self.assertEqual(article1.start, datetime.date.today())
+        self.assertEqual(Article.objects.get(pk=self.article2.pk).status, Article.STATUS.draft)
+        entry = ArticleLog.objects.order_by('pk').last()
+        self.assertEqual((entry.object_id, entry.start), (self.article1.pk, datetime.date.today()))
+
+    def test_unpublish(self):
+        """Unpublished articles are no longer live."""
+
+        self.assertEqual(Article.objects.live().count(), 1)
+        self.assertEqual(Article.objects.filter(title='article 3').unpublish(), 1)
+        self.assertEqual(Article.objects.live().count(), 0)
+
+    def test_transition(self):
+        """Any status can be used; the cache is invalidated."""
+
+        self.assertEqual(len(Article.objects.live_cached(statuses=['draft'])), 2)
+        self.assertEqual(Article.objects.filter(title='article 1').transition(Article.STATUS.published), 1)
+        self.assertEqual(len(Article.objects.live_cached(statuses=['draft'])), 1)
+
+
+class PartitioningTest(TestCase):
+    """Support for partitioning the table by start date (PostgreSQL only)."""
+
+    def test_sql(self):
+        """SQL that creates the partitions."""
+
+        statements = create_partitions_sql('news_article', connection.ops.quote_name, 2024, 2025)
+        self.assertEqual(statements, [
+            'CREATE TABLE IF NOT EXISTS "news_article_default" PARTITION OF "news_article" DEFAULT',
+            'CREATE TABLE IF NOT EXISTS "news_article_2024" PARTITION OF "news_article" '
+            "FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')",
+            'CREATE TABLE IF NOT EXISTS "news_article_2025" PARTITION OF "news_article" '
+            "FOR VALUES FROM ('2025-01-01') TO ('2026-01-01')",
+        ])
+
+        statements = create_partitions_sql('news_article', connection.ops.quote_name, 2024, 2024, 'month')
+        self.assertEqual(len(statements), 13)
+        self.assertEqual(statements[-1],
+                         'CREATE TABLE IF NOT EXISTS "news_article_2024_12" PARTITION OF "news_article" '
+                         "FOR VALUES FROM ('2024-12-01') TO ('2025-01-01')")
+
+    def test_command(self):
+        """The example project uses SQLite, which does not support partitions."""
+
+        with self.assertRaisesMessage(CommandError, 'Partitioning is only available with PostgreSQL.'):
+            call_command('minipub_create_partitions', 'news.Article')
+        with self.assertRaises(CommandError):
+            call_command('minipub_create_partitions', 'news.Foo')
+
+
+class ArticleCacheTest(TestCase):
+    """The list of live articles can be cached."""
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.article1 = ArticleFactory(title='article 1')
+
+    def test_cached(self):
+        """The second call does not hit the database."""
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Article.objects.live_cached(), [self.article1])
+        with self.assertNumQueries(0):
+            self.assertEqual(Article.objects.live_cached(), [self.article1])
+
+        # Different statuses or queries are cached separately.
+        with self.assertNumQueries(1):
+            self.assertEqual(Article.objects.live_cached(statuses=['draft']), [])
+        with self.assertNumQueries(1):
+            self.assertEqual(Article.objects.filter(title='foo').live_cached(), [])
+
+        # Empty querysets have no SQL.
+        with self.assertNumQueries(0):
+            self.assertEqual(Article.objects.none().live_cached(), [])
+
+    def test_save(self):
+        """Saving an article invalidates the cache."""
+
+        self.assertEqual(Article.objects.live_cached(), [self.article1])
+
+        self.article1.status = Article.STATUS.draft
+        self.article1.save()
+        self.assertEqual(Article.objects.live_cached(), [])
+
+        article2 = ArticleFactory(title='article 2')
+        self.assertEqual(Article.objects.live_cached(), [article2])
+
+    def test_delete(self):
+        """Deleting an article invalidates the cache."""
+
+        self.assertEqual(Article.objects.live_cached(), [self.article1])
+
+        self.article1.delete()
+        self.assertEqual(Article.objects.live_cached(), [])
+
+    def test_other_models(self):
+        """Only minipub models touch the cache."""
+
+        with mock.patch('minipub.caching.invalidate') as invalidate:
+            User.objects.create_user('john.doe')
+            invalidate.assert_not_called()
+            self.article1.save()
+            invalidate.assert_called_once_with(Article)
+
+    def test_cache_failure(self):
+        """Articles can be saved even if the cache is down."""
+
+        broken = mock.Mock()
+        broken.set.side_effect = ConnectionError
+        with mock.patch('minipub.caching.get_cache', return_value=broken), \
+                self.assertLogs('minipub', 'ERROR'):
+            self.article1.save()
+            Article.objects.all().unpublish()
+
+
 class ArticleListTest(TestCase):
     """The landing page has a list of all articles."""
 
@@ -174,6 +398,25 @@ class ArticleListTest(TestCase):
         self.assertQuerySetEqual(response.context['date_list'],
                                  ['datetime.date(2012, 1, 1)'], transform=repr)
 
+    def test_get_date_list_cached(self):
+        """The list of years is cached, until an article is changed."""
+
+        self.client.get('/news/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/news/')
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(response.context['date_list'], [datetime.date(2012, 1, 1), datetime.date(2011, 1, 1)])
+
+        self.article1.status = Article.STATUS.draft
+        self.article1.save()
+
+        response = self.client.get('/news/')
+        self.assertEqual(response.context['date_list'], [datetime.date(2012, 1, 1)])
+
+        # Also used for the list of years on the year page.
+        response = self.client.get('/news/year/2012/')
+        self.assertEqual(response.context['date_list'], [datetime.date(2012, 1, 1)])
+
     def test_get_date_list_staff(self):
         """Archive view has a list of years for which we have articles - staff will
         see all articles.
@@ -196,6 +439,64 @@ class ArticleListTest(TestCase):
                                  ['datetime.date(2012, 1, 1)', 'datetime.date(2011, 1, 1)'], transform=repr)
 
 
+class KeysetPaginationTest(TestCase):
+    """Archive pages can be paginated with a cursor."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='article 1', start=datetime.date(2011, 12, 23))
+        self.article2 = ArticleFactory(title='article 2', start=datetime.date(2012, 12, 25))
+        self.article3 = ArticleFactory(title='article 3', start=datetime.date(2012, 12, 25))
+        self.article4 = ArticleFactory(title='article 4', start=datetime.date(2011, 12, 1))
+        self.article5 = ArticleFactory(title='article 5', start=datetime.date(2012, 12, 25),
+                                       status=Article.STATUS.draft)
+        self.factory = RequestFactory()
+
+    def get(self, view_class, user=None, **kwargs):
+        class PaginatedView(KeysetPaginationMixin, view_class):
+            paginate_by = 2
+        request = self.factory.get('/news/', data={'after': kwargs.pop('after')} if 'after' in kwargs else {})
+        request.user = user or AnonymousUser()
+        return PaginatedView.as_view()(request, **kwargs)
+
+    def get_all_pages(self, view_class, **kwargs):
+        pages = []
+        response = self.get(view_class, **kwargs)
+        while True:
+            pages.append([article.title for article in response.context_data['article_list']])
+            if not response.context_data['next_cursor']:
+                return pages
+            response = self.get(view_class, after=response.context_data['next_cursor'], **kwargs)
+
+    def test_pages(self):
+        """Pages are ordered by start date, then pk."""
+
+        self.assertEqual(self.get_all_pages(ArticleArchiveView),
+                         [['article 3', 'article 2'], ['article 1', 'article 4']])
+        response = self.get(ArticleArchiveView)
+        self.assertEqual(response.context_data['is_paginated'], True)
+
+    def test_year(self):
+        """Works with the year archive."""
+
+        self.assertEqual(self.get_all_pages(ArticleYearArchiveView, year=2011),
+                         [['article 1', 'article 4']])
+
+    def test_staff(self):
+        """Staff also see the draft articles."""
+
+        user = User.objects.create_user('john.doe', is_staff=True)
+        self.assertEqual(self.get_all_pages(ArticleArchiveView, user=user),
+                         [['article 5', 'article 3'], ['article 2', 'article 1'], ['article 4']])
+
+    def test_bad_cursor(self):
+        """Invalid cursors give a 404."""
+
+        with self.assertRaises(Http404):
+            self.get(ArticleArchiveView, after='foo')
+        with self.assertRaises(Http404):
+            self.get(ArticleArchiveView, after='2011-13-01.1')
+
+
 class ArticleListYearTest(TestCase):
     """The landing page lists all the years for which we have articles.
     Then we can filter down the show just the articles for a given year."""
@@ -261,6 +562,29 @@ class ArticleListYearTest(TestCase):
         response = self.client.get('/news/year/2012/')
         self.assertEqual(response.status_code, 200)
 
+    def test_year_not_live_editor(self):
+        """The year page follows the view's preview policy, for the sidebar too."""
+
+        self.article3.status = Article.STATUS.draft
+        self.article3.save()
+        create_editor()
+        self.assertTrue(self.client.login(username='jane.doe', password='secret'))
+
+        with mock.patch.object(ArticleYearArchiveView, 'minipub_preview', EditorPreview()):
+            response = self.client.get('/news/year/2012/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['minipub_staff_preview'])
+        self.assertEqual(list(response.context['date_list']),
+                         [datetime.date(2012, 1, 1),
+                          datetime.date(2011, 1, 1)])
+
+        # Staff without the permission see the public page.
+        User.objects.create_user('john.doe', 'john.doe@example.com', 'secret', is_staff=True)
+        self.assertTrue(self.client.login(username='john.doe', password='secret'))
+        with mock.patch.object(ArticleYearArchiveView, 'minipub_preview', EditorPreview()):
+            response = self.client.get('/news/year/2012/')
+        self.assertEqual(response.status_code, 404)
+
 
 class ArticleDetailTest(TestCase):
 
@@ -304,6 +628,832 @@ class ArticleDetailTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class AdminTest(TestCase):
+    """The admin changelist shows which articles are live."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='article 1')
+        self.article2 = ArticleFactory(title='article 2', start=datetime.date(2999, 1, 1))
+        self.article3 = ArticleFactory(title='article 3', end=datetime.date(1901, 1, 1))
+        self.article4 = ArticleFactory(title='article 4', status=Article.STATUS.draft)
+
+        user = User.objects.create_superuser('john.doe',
+                                             'john.doe@example.com',
+                                             'secret')
+        self.client.force_login(user)
+
+    def get_titles(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [article.title for article in response.context['cl'].result_list]
+
+    def test_live_column(self):
+        """The live status is computed by the database, and can be sorted on."""
+
+        response = self.client.get('/admin/news/article/')
+        self.assertEqual({article.title: article.is_live for article in response.context['cl'].result_list},
+                         {'article 1': True, 'article 2': False, 'article 3': False, 'article 4': False})
+
+        # Sorted on the 'live' column (2nd in the list_display).
+        self.assertEqual(self.get_titles('/admin/news/article/?o=-2.1')[0], 'article 1')
+
+    def test_filter(self):
+        """Articles can be filtered on live/scheduled/expired."""
+
+        self.assertEqual(self.get_titles('/admin/news/article/?live=live'), ['article 1'])
+        self.assertEqual(self.get_titles('/admin/news/article/?live=scheduled'), ['article 2'])
+        self.assertEqual(self.get_titles('/admin/news/article/?live=expired'), ['article 3'])
+        self.assertEqual(len(self.get_titles('/admin/news/article/')), 4)
+
+
+class PageQueriesTest(QueryCountTestMixin, TestCase):
+    """The number of queries of a page does not depend on the number of articles."""
+
+    def test_list(self):
+        ArticleFactory.create_batch(3)
+        caching.get_cache().clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/news/')
+        ArticleFactory.create_batch(20)
+        caching.get_cache().clear()
+        self.assertPageQueries('/news/', len(queries))
+
+
+class DetailNotFoundCacheTest(TestCase):
+    """Pages that are not found are remembered."""
+
+    def setUp(self):
+        caching.get_cache().clear()
+
+    def test_cached(self):
+        """The second request does not query the database."""
+
+        self.assertEqual(self.client.get('/news/some-news-about-me/').status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/news/some-news-about-me/').status_code, 404)
+
+        # Until an article is saved.
+        ArticleFactory(title='Some news about me')
+        self.assertEqual(self.client.get('/news/some-news-about-me/').status_code, 200)
+
+    def test_staff(self):
+        """Staff previews are not cached."""
+
+        ArticleFactory(title='Some news about me', status=Article.STATUS.draft)
+        self.assertEqual(self.client.get('/news/some-news-about-me/').status_code, 404)
+        User.objects.create_user('john.doe', 'john.doe@example.com', 'secret', is_staff=True)
+        self.assertTrue(self.client.login(username='john.doe', password='secret'))
+        self.assertEqual(self.client.get('/news/some-news-about-me/').status_code, 200)
+
+    def test_index(self):
+        """The lookup is a single query on the slug, status and dates."""
+
+        article = ArticleFactory(title='Some news about me')
+        view = ArticleDetailView()
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        view.setup(request, slug=article.slug)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(view.get_object(), article)
+        self.assertEqual(len(queries), 1)
+        where = queries[0]['sql'].split('WHERE')[1]
+        for field in ('slug', 'status', 'start', 'end'):
+            self.assertIn(f'"{field}"', where)
+
+
+class ConditionalGetTest(TestCase):
+    """Anonymous users get a '304 Not Modified' if the page has not changed."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me',
+                                       start=datetime.date(day=23, month=12, year=2011))
+
+    def assertNotModified(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response2 = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response2.status_code, 304)
+        response2 = self.client.get(url, headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(response2.status_code, 304)
+        return response
+
+    def test_pages(self):
+        """All pages support conditional requests."""
+
+        self.assertNotModified('/news/')
+        self.assertNotModified('/news/year/2011/')
+        self.assertNotModified('/news/some-news-about-me/')
+
+    def test_changed(self):
+        """The ETag changes when an article is modified, or leaves the page."""
+
+        response = self.assertNotModified('/news/')
+
+        article2 = ArticleFactory(title='article 2', start=datetime.date(day=23, month=12, year=2011))
+        response2 = self.client.get('/news/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response2.status_code, 200)
+
+        article2.delete()
+        response3 = self.client.get('/news/', headers={'if-none-match': response2['ETag']})
+        self.assertEqual(response3.status_code, 200)
+
+    def test_other_article(self):
+        """The ETag of a detail page only depends on that article."""
+
+        response = self.client.get('/news/some-news-about-me/')
+        ArticleFactory(title='article 2')
+        response = self.client.get('/news/some-news-about-me/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_staff(self):
+        """Logged-in users always get the full page."""
+
+        user = User.objects.create_user('john.doe',
+                                        'john.doe@example.com',
+                                        'secret')
+        user.is_staff = True
+        user.save()
+
+        response = self.client.get('/news/')
+        self.assertTrue(self.client.login(username='john.doe', password='secret'))
+        response = self.client.get('/news/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class CacheControlTest(TestCase):
+    """Pages expire when the next article goes live or expires."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me')
+
+    def test_max_age(self):
+        """Without any upcoming change, the maximum age is used."""
+
+        response = self.client.get('/news/')
+        self.assertEqual(response['Cache-Control'], 'max-age=86400')
+        self.assertTrue(response.has_header('Expires'))
+
+    def test_boundary(self):
+        """The page expires at midnight if an article goes live tomorrow."""
+
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        ArticleFactory(start=tomorrow)
+        midnight = timezone.make_aware(datetime.datetime.combine(tomorrow, datetime.time.min))
+        seconds_to_midnight = (midnight - timezone.now()).total_seconds()
+
+        response = self.client.get('/news/some-news-about-me/')
+        max_age = int(response['Cache-Control'].split('=')[1])
+        self.assertLessEqual(max_age, seconds_to_midnight)
+        self.assertGreater(max_age, seconds_to_midnight - 10)
+
+    def test_staff(self):
+        """Logged-in users' pages are not cached."""
+
+        User.objects.create_user('john.doe',
+                                 'john.doe@example.com',
+                                 'secret')
+        self.assertTrue(self.client.login(username='john.doe', password='secret'))
+        response = self.client.get('/news/')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+
+class NoPreview(StaffPreview):
+
+    def applies(self, user):
+        return False
+
+
+class EditorPreview(StaffPreview):
+
+    def applies(self, user):
+        return user.has_perm('news.change_article')
+
+
+def create_editor():
+    """A user who can change articles, but is not a member of staff."""
+    user = User.objects.create_user('jane.doe', 'jane.doe@example.com', 'secret')
+    user.user_permissions.add(Permission.objects.get(codename='change_article', content_type__app_label='news'))
+    return user
+
+
+class StaffPreviewTest(TestCase):
+    """Staff see the public live set, plus an overlay of the other articles."""
+
+    def setUp(self):
+        caching.get_cache().clear()
+        today = datetime.date.today()
+        ArticleFactory(title='Live', start=today - datetime.timedelta(days=2))
+        ArticleFactory(title='Draft', status=Article.STATUS.draft, start=today - datetime.timedelta(days=1))
+        ArticleFactory(title='Scheduled', start=today + datetime.timedelta(days=1))
+        ArticleFactory(title='Expired', start=today - datetime.timedelta(days=5),
+                       end=today - datetime.timedelta(days=3))
+        self.public = RequestFactory().get('/')
+        self.public.user = AnonymousUser()
+        self.staff = RequestFactory().get('/')
+        self.staff.user = User.objects.create_user('john.doe', is_staff=True)
+
+    def get_titles(self, request, view_class=ArticleArchiveView):
+        view = view_class()
+        view.setup(request)
+        with CaptureQueriesContext(connection) as queries:
+            objects = view.get_live_objects(Article.objects.order_by('-start'))
+        return [article.title for article in objects], len(queries)
+
+    def test_public(self):
+        """The public list is cached."""
+
+        self.assertEqual(self.get_titles(self.public), (['Live'], 1))
+        self.assertEqual(self.get_titles(self.public), (['Live'], 0))
+
+    def test_staff(self):
+        """Only the overlay is queried for staff."""
+
+        self.get_titles(self.public)
+        self.assertEqual(self.get_titles(self.staff), (['Scheduled', 'Draft', 'Live', 'Expired'], 1))
+
+        view = ArticleArchiveView()
+        view.setup(self.staff)
+        self.assertEqual(len(view.get_live_objects(Article.objects.order_by('-start'), limit=2)), 2)
+
+    def test_nulls(self):
+        """Undated objects are merged in where the database would put them."""
+
+        ArticleFactory(title='Undated', status=Article.STATUS.draft, start=None)
+        view = ArticleArchiveView()
+        view.setup(self.staff)
+        for ordering in ['-start', 'start', F('start').asc(nulls_last=True), F('start').desc(nulls_first=True)]:
+            with self.subTest(ordering=ordering):
+                expected = [article.title for article in view.get_queryset().order_by(ordering, 'pk')[:3]]
+                objects = view.get_live_objects(Article.objects.order_by(ordering, 'pk'), limit=3)
+                self.assertEqual([article.title for article in objects], expected)
+
+    def test_policy(self):
+        """The policy can be changed."""
+
+        class View(ArticleArchiveView):
+            minipub_preview = NoPreview()
+
+        self.assertEqual(self.get_titles(self.staff, View)[0], ['Live'])
+        view = View()
+        view.setup(self.staff)
+        self.assertQuerySetEqual(view.get_queryset(), ['<Article: Live>'], transform=repr)
+
+
+class RoutingTest(TransactionTestCase):
+    """Public reads can go to a read replica."""
+
+    # The replica is a second connection to the test database: it cannot read from inside
+    # the transaction of a TestCase.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me')
+
+    def test_no_replica(self):
+        """Without a replica, the normal database routing is used."""
+
+        self.assertEqual(Article.objects.live().using_replica().db, 'default')
+
+    def test_replica(self):
+        """The public pages and the sitemaps read from the replica."""
+
+        with self.settings(MINIPUB_READ_REPLICA='replica', MINIPUB_READ_YOUR_WRITES=0):
+            self.assertEqual(Article.objects.live().using_replica().db, 'replica')
+            response = self.client.get('/news/')
+            self.assertEqual(response.context['article_list'].db, 'replica')
+            self.assertContains(response, 'Some news about me')
+            self.assertEqual(NewsSitemap().items().db, 'replica')
+
+    def test_recent_write(self):
+        """Just after a change, reads stay on the primary database."""
+
+        with self.settings(MINIPUB_READ_REPLICA='replica'):
+            self.assertEqual(Article.objects.live().using_replica().db, 'default')
+
+    def test_no_cache(self):
+        """Without a working cache, reads stay on the primary database."""
+
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'dummy': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        }
+        with self.settings(CACHES=caches, MINIPUB_CACHE='dummy', MINIPUB_READ_REPLICA='replica',
+                           MINIPUB_READ_YOUR_WRITES=0):
+            self.assertEqual(Article.objects.live().using_replica().db, 'default')
+            self.assertEqual(self.client.get('/news/').status_code, 200)
+
+    async def test_async(self):
+        """Async views look up the replica without reading the cache from the event loop."""
+
+        request = AsyncRequestFactory().get('/news/')
+
+        async def auser():
+            return AnonymousUser()
+        request.auser = auser
+        view = AsyncArticleArchiveView()
+        view.setup(request)
+        with mock.patch('minipub.caching.get_generation') as get_generation:
+            self.assertEqual((await view.aget_queryset()).db, 'default')
+        get_generation.assert_not_called()
+
+        def get_generation(model):
+            # Not called from the event loop.
+            with self.assertRaises(RuntimeError):
+                asyncio.get_running_loop()
+            return 0
+        with self.settings(MINIPUB_READ_REPLICA='replica'):
+            with mock.patch('minipub.caching.get_generation', side_effect=get_generation) as mocked:
+                self.assertEqual((await view.aget_queryset()).db, 'replica')
+        mocked.assert_called_once_with(Article)
+
+    def test_staff(self):
+        """Staff previews always use the primary database."""
+
+        User.objects.create_user('john.doe', 'john.doe@example.com', 'secret', is_staff=True)
+        self.assertTrue(self.client.login(username='john.doe', password='secret'))
+        with self.settings(MINIPUB_READ_REPLICA='replica', MINIPUB_READ_YOUR_WRITES=0):
+            response = self.client.get('/news/')
+        self.assertEqual(response.context['article_list'].db, 'default')
+
+
+class SchedulerTest(TestCase):
+    """Signals are sent when articles go live or expire."""
+
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = self.settings(MINIPUB_SCHEDULER_STATE=os.path.join(tmp.name, 'scheduler.json'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.article1 = ArticleFactory(title='Goes live', start=self.today)
+        self.article2 = ArticleFactory(title='Expires', start=self.today - datetime.timedelta(days=10),
+                                       end=self.yesterday)
+        self.article3 = ArticleFactory(title='Already live', start=self.yesterday)
+        ArticleFactory(title='Draft', status=Article.STATUS.draft, start=self.today)
+        self.received = []
+        for signal in (minipub_went_live, minipub_expired):
+            signal.connect(self.receiver, sender=Article)
+            self.addCleanup(signal.disconnect, self.receiver, sender=Article)
+
+    def receiver(self, signal, sender, objects, **kwargs):
+        self.received.append((signal, [obj.title for obj in objects]))
+
+    def test_tick(self):
+        """Each article is reported once."""
+
+        self.assertEqual(tick(Article), (1, 1))
+        self.assertEqual(self.received, [(minipub_went_live, ['Goes live']), (minipub_expired, ['Expires'])])
+        self.assertEqual(get_last_run(Article), self.today)
+
+        # Nothing new - even from another process, that does not share the cache.
+        caching.get_cache().clear()
+        self.assertEqual(tick(Article), (0, 0))
+        self.assertEqual(len(self.received), 2)
+
+    def test_since(self):
+        """Changes can be reported from an earlier date, in batches."""
+
+        ArticleFactory(title='Scheduled', start=self.today + datetime.timedelta(days=1))
+        since = self.today - datetime.timedelta(days=2)
+        self.assertEqual(tick(Article, since=since, batch_size=1), (2, 1))
+        self.assertEqual(self.received, [(minipub_went_live, ['Goes live']),
+                                         (minipub_went_live, ['Already live']),
+                                         (minipub_expired, ['Expires'])])
+
+    def test_command(self):
+        """The management command checks all minipub models."""
+
+        out = StringIO()
+        call_command('minipub_scheduler', stdout=out)
+        self.assertIn('news.Article: 1 went live, 1 expired.', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('minipub_scheduler', 'news.Nope')
+
+    def test_no_state(self):
+        """Without somewhere to store the last run, the command needs a start date."""
+
+        with self.settings(MINIPUB_SCHEDULER_STATE=None):
+            with self.assertRaises(CommandError):
+                call_command('minipub_scheduler')
+            out = StringIO()
+            call_command('minipub_scheduler', '--since', self.yesterday.isoformat(), stdout=out)
+            self.assertIn('news.Article: 1 went live, 1 expired.', out.getvalue())
+
+
+class LiveAsOfTest(TestCase):
+    """Articles can be checked against other dates."""
+
+    def setUp(self):
+        self.today = datetime.date.today()
+        self.tomorrow = self.today + datetime.timedelta(days=1)
+        self.article1 = ArticleFactory(title='Today', start=self.today, end=self.today)
+        self.article2 = ArticleFactory(title='Tomorrow', start=self.tomorrow)
+        ArticleFactory(title='No start', start=None, status=Article.STATUS.draft)
+        ArticleFactory(title='January', start=datetime.date(2024, 1, 1), end=datetime.date(2024, 1, 31))
+        ArticleFactory(title='From February', start=datetime.date(2024, 2, 1))
+
+    def test_as_of(self):
+        """live() can use another date."""
+
+        self.assertQuerySetEqual(Article.objects.live(as_of=self.tomorrow).order_by('title'),
+                                 ['<Article: From February>', '<Article: Tomorrow>'], transform=repr)
+        self.assertFalse(self.article1.live(as_of=self.tomorrow))
+        self.assertTrue(self.article2.live(as_of=self.tomorrow))
+        self.assertQuerySetEqual(
+            Article.objects.with_live(as_of=datetime.date(2024, 1, 15)).filter(is_live=True),
+            ['<Article: January>'], transform=repr)
+
+    def test_live_counts(self):
+        """The counts for many dates are computed with a single query."""
+
+        dates = [datetime.date(2023, 12, 31) + datetime.timedelta(days=n) for n in range(40)]
+        dates += [self.today, self.tomorrow]
+        with self.assertNumQueries(1):
+            counts = Article.objects.live_counts(dates)
+        self.assertEqual(counts, {date: Article.objects.live(as_of=date).count() for date in dates})
+        self.assertEqual(counts[datetime.date(2024, 1, 31)], 1)
+        self.assertEqual(counts[datetime.date(2024, 2, 1)], 1)
+        self.assertEqual(counts[self.today], 2)
+
+        # Objects without a start date are counted from the beginning.
+        self.assertEqual(Article.objects.live_counts([datetime.date(2000, 1, 1)], statuses=['draft']),
+                         {datetime.date(2000, 1, 1): 1})
+
+
+class TransitionLogTest(TestCase):
+    """Changes of status, start and end dates are logged."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me')
+
+    def test_save(self):
+        """Only the saves that change the status or dates are logged."""
+
+        self.assertQuerySetEqual(ArticleLog.objects.values_list('object_id', 'status', 'start', 'end'),
+                                 [(self.article1.pk, 1, datetime.date.today(), None)])
+
+        article = Article.objects.get(pk=self.article1.pk)
+        article.title = 'New title'
+        article.save()
+        self.assertEqual(ArticleLog.objects.count(), 1)
+
+        article.status = Article.STATUS.draft
+        article.save()
+        self.assertEqual(ArticleLog.objects.order_by('pk').last().status, 0)
+
+    def test_transition(self):
+        """Bulk changes are logged, with the start date they are given."""
+
+        ArticleFactory(status=Article.STATUS.draft, start=None)
+        ArticleFactory(status=Article.STATUS.draft, start=None)
+        ArticleLog.objects.all().delete()
+        self.assertEqual(Article.objects.publish(), 2)
+        self.assertQuerySetEqual(ArticleLog.objects.values_list('status', 'start'),
+                                 [(1, datetime.date.today())] * 2, ordered=False)
+
+    def test_live_on(self):
+        """The log tells which articles were live on a past date."""
+
+        article2 = ArticleFactory(title='Article 2')
+        ArticleLog.objects.all().delete()
+
+        def log(article, status, start, end, changed):
+            ArticleLog.objects.create(object_id=article.pk, status=Article.minipub_status_codes()[status],
+                                      start=start, end=end,
+                                      changed=timezone.make_aware(datetime.datetime(*changed)))
+
+        log(self.article1, 'published', datetime.date(2024, 1, 10), None, (2024, 1, 1, 12))
+        log(self.article1, 'draft', datetime.date(2024, 1, 10), None, (2024, 2, 1, 12))
+        log(article2, 'published', datetime.date(2024, 1, 1), datetime.date(2024, 1, 20), (2024, 1, 1, 9))
+
+        def live_on(*date):
+            return sorted(article.title for article in Article.objects.live_on(datetime.date(*date)))
+
+        self.assertEqual(live_on(2023, 12, 31), [])
+        self.assertEqual(live_on(2024, 1, 5), ['Article 2'])
+        self.assertEqual(live_on(2024, 1, 15), ['Article 2', 'Some news about me'])
+        self.assertEqual(live_on(2024, 1, 31), ['Some news about me'])
+        # Unpublished during the day.
+        self.assertEqual(live_on(2024, 2, 1), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'The query plan is checked on SQLite.')
+    def test_live_on_plan(self):
+        """live_on() reads the log through its index, rather than scanning it."""
+
+        plan = Article.objects.live_on(datetime.date.today()).explain()
+        self.assertEqual(re.findall(r'\bSCAN (\w+)', plan), ['news_article'])
+        self.assertIn('news_articlelog_obj', plan)
+
+    def test_no_log(self):
+        """live_on() needs a log."""
+
+        with self.assertRaises(ImproperlyConfigured):
+            ArchiveArticle.objects.live_on(datetime.date.today())
+
+
+class FragmentCacheTest(TestCase):
+    """Template fragments are cached according to the publication state of the articles."""
+
+    template = Template('{% load minipub_tags %}{% minipub_cache 600 teaser article %}'
+                        '{{ article.title }}{% if article.staff_preview %} (preview){% endif %}'
+                        '{% endminipub_cache %}')
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.article1 = ArticleFactory(title='Some news about me')
+
+    def render(self, staff, article):
+        return self.template.render(Context({'minipub_staff_preview': staff, 'article': article}))
+
+    def test_staff(self):
+        """Staff previews are cached separately."""
+
+        draft = ArticleFactory(title='Draft', status=Article.STATUS.draft)
+        self.assertEqual(self.render(True, draft), 'Draft (preview)')
+        # Not taken from the staff cache.
+        draft.title = 'Not saved'
+        self.assertEqual(self.render(False, draft), 'Not saved (preview)')
+        self.assertEqual(self.render(True, draft), 'Draft (preview)')
+
+    def test_changes(self):
+        """The fragment is refreshed when the article changes, but not otherwise."""
+
+        self.assertEqual(self.render(False, self.article1), 'Some news about me')
+        stale = Article.objects.get(pk=self.article1.pk)
+        stale.title = 'Not saved'
+        self.assertEqual(self.render(False, stale), 'Some news about me')
+
+        self.article1.title = 'Updated'
+        self.article1.save()
+        self.assertEqual(self.render(False, self.article1), 'Updated')
+
+    def test_epoch(self):
+        """Fragments are not reused on another day."""
+
+        key = caching.make_fragment_key('teaser', [self.article1])
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        with mock.patch.object(Article, 'minipub_now', return_value=tomorrow):
+            self.assertNotEqual(caching.make_fragment_key('teaser', [self.article1]), key)
+
+    def test_queryset(self):
+        """Fragments that depend on a queryset are refreshed when any article changes."""
+
+        key = caching.make_fragment_key('list', [Article.objects.live()])
+        self.assertEqual(caching.make_fragment_key('list', [Article.objects.live()]), key)
+        ArticleFactory()
+        self.assertNotEqual(caching.make_fragment_key('list', [Article.objects.live()]), key)
+
+    def test_empty_queryset(self):
+        """Archive views replace their queryset with none() when there are no articles."""
+
+        template = Template('{% load minipub_tags %}{% minipub_cache 60 list article_list %}'
+                            '{{ article_list|length }}{% endminipub_cache %}')
+        context = Context({'minipub_staff_preview': False, 'article_list': Article.objects.none()})
+        self.assertEqual(template.render(context), '0')
+
+    def test_editor(self):
+        """The views tell the tag whether their preview policy applies to the user."""
+
+        draft = ArticleFactory(title='Draft', status=Article.STATUS.draft, start=datetime.date.today())
+        create_editor()
+        self.assertTrue(self.client.login(username='jane.doe', password='secret'))
+        with mock.patch.object(ArticleArchiveView, 'minipub_preview', EditorPreview()):
+            response = self.client.get('/news/')
+        self.assertTrue(response.context['minipub_staff_preview'])
+        self.assertContains(response, 'Draft preview')
+
+        # The preview was not cached for the public.
+        draft.title = 'Not saved'
+        self.assertEqual(self.render(False, draft), 'Not saved (preview)')
+
+    def test_no_preview_flag(self):
+        """Outside of minipub views, nothing is cached."""
+
+        template = Template('{% load minipub_tags %}{% minipub_cache 600 teaser article %}'
+                            '{{ article.title }}{% endminipub_cache %}')
+        self.assertEqual(template.render(Context({'article': self.article1})), 'Some news about me')
+        self.article1.title = 'Not saved'
+        self.assertEqual(template.render(Context({'article': self.article1})), 'Not saved')
+
+
+class PrebuiltSitemapTest(TestCase):
+    """Sitemaps can be written to disk and served from there."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Test article')
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        settings_override = self.settings(MINIPUB_SITEMAP_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build(self, *args):
+        out = StringIO()
+        call_command('minipub_build_sitemaps', *args, stdout=out)
+        return out.getvalue()
+
+    def test_build(self):
+        """All sections are written on the first run, then only those that change."""
+
+        self.assertEqual(self.build(), 'Sections written: news, published, archived.\n')
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'news-1.xml.gz')))
+        self.assertEqual(self.build(), 'Sections written: none.\n')
+
+        ArticleFactory(title='Another article')
+        self.assertEqual(self.build(), 'Sections written: news.\n')
+
+        # Simulate an article expiring.
+        Article.objects.update(end=datetime.date.today() - datetime.timedelta(days=1))
+        self.assertEqual(self.build(), 'Sections written: news.\n')
+
+        self.assertEqual(self.build('--force'), 'Sections written: news, published, archived.\n')
+
+    def test_serve(self):
+        """The files are served without any database queries."""
+
+        self.build()
+        with self.assertNumQueries(0):
+            response = self.client.get('/prebuilt/sitemap-news.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<loc>https://example.com/news/test-article/</loc>')
+
+        response = self.client.get('/prebuilt/sitemap-news.xml', headers={'accept-encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'/news/test-article/', gzip.decompress(response.content))
+
+        response = self.client.get('/prebuilt/sitemap-news.xml?p=2')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/prebuilt/sitemap-foo.xml')
+        self.assertEqual(response.status_code, 404)
+
+    def test_index(self):
+        """The index lists every page of every section, including those not written again."""
+
+        response = self.client.get('/prebuilt/sitemap.xml')
+        self.assertEqual(response.status_code, 404)
+
+        self.build()
+        self.assertEqual(self.build(), 'Sections written: none.\n')
+        with self.assertNumQueries(0):
+            response = self.client.get('/prebuilt/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<loc>https://example.com/prebuilt/sitemap-news.xml</loc>')
+        self.assertContains(response, '<loc>https://example.com/prebuilt/sitemap-archived.xml</loc>')
+        self.assertContains(response, f'<lastmod>{self.article1.modified.isoformat()}</lastmod>')
+        self.assertNotContains(response, '?p=2')
+
+        with mock.patch.object(NewsSitemap, 'limit', 1):
+            ArticleFactory(title='Another article')
+            self.build()
+        response = self.client.get('/prebuilt/sitemap.xml')
+        self.assertContains(response, '<loc>https://example.com/prebuilt/sitemap-news.xml?p=2</loc>')
+
+    def test_stale_pages(self):
+        """Pages that are no longer needed are removed, even if some are already gone."""
+
+        ArticleFactory(title='Another article')
+        with mock.patch.object(NewsSitemap, 'limit', 1):
+            self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'news-2.xml.gz')))
+        os.remove(os.path.join(self.root, 'news-2.xml.gz'))
+
+        self.build('--force')
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'news-1.xml.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'news-2.xml.gz')))
+
+
+class InstrumentationTest(TestCase):
+    """Views and sitemaps can record their database usage."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me')
+        self.factory = RequestFactory()
+        self.reports = []
+
+        def receiver(sender, **kwargs):
+            self.reports.append(kwargs)
+        instrumented.connect(receiver)
+        self.addCleanup(instrumented.disconnect, receiver)
+
+    def get(self, view_class, user=None, **kwargs):
+        class InstrumentedView(InstrumentationMixin, view_class):
+            pass
+        request = self.factory.get('/news/')
+        request.user = user or AnonymousUser()
+        return InstrumentedView.as_view()(request, **kwargs)
+
+    def test_list(self):
+        """List view."""
+
+        with self.assertLogs('minipub', 'INFO') as logs:
+            response = self.get(ArticleArchiveView)
+        self.assertIn('db;desc="', response['Server-Timing'])
+        self.assertIn('minipub;desc="public"', response['Server-Timing'])
+        self.assertIn('1 rows, public branch', logs.output[0])
+
+        report = self.reports[0]
+        self.assertEqual(report['rows'], 1)
+        self.assertEqual(report['branch'], 'public')
+        self.assertGreater(report['queries'], 0)
+        self.assertGreaterEqual(report['total_time'], report['sql_time'])
+
+    def test_detail_staff(self):
+        """Detail view, seen by a member of staff."""
+
+        user = User.objects.create_user('john.doe', is_staff=True)
+        response = self.get(ArticleDetailView, user=user, slug='some-news-about-me')
+        self.assertIn('minipub;desc="staff"', response['Server-Timing'])
+        self.assertEqual(self.reports[0]['rows'], 1)
+        self.assertEqual(self.reports[0]['branch'], 'staff')
+
+    def test_sitemap(self):
+        """Sitemaps are only instrumented if requested."""
+
+        sitemap = NewsSitemap()
+        sitemap.get_urls(site=Site(domain='example.com'))
+        self.assertEqual(self.reports, [])
+
+        sitemap.minipub_instrument = True
+        sitemap.get_urls(site=Site(domain='example.com'))
+        self.assertEqual(self.reports[0]['label'], 'NewsSitemap page 1')
+        self.assertEqual(self.reports[0]['rows'], 1)
+        self.assertEqual(self.reports[0]['queries'], 2)
+
+
+class AsyncArticleArchiveView(MinipubAsyncArchiveIndexView):
+    model = Article
+    context_object_name = 'article_list'
+    allow_empty = True
+
+
+class AsyncArticleDetailView(MinipubAsyncDetailView):
+    model = Article
+
+
+class AsyncTest(TestCase):
+    """Async queryset method and views."""
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='article 1', start=datetime.date(2011, 12, 23))
+        self.article2 = ArticleFactory(title='article 2', start=datetime.date(2012, 12, 24),
+                                       status=Article.STATUS.draft)
+        self.staff = User.objects.create_user('john.doe', is_staff=True)
+        self.factory = AsyncRequestFactory()
+
+    async def get(self, view_class, user=None, **kwargs):
+        request = self.factory.get('/news/')
+
+        async def auser():
+            return user or AnonymousUser()
+        request.auser = auser
+        return await view_class.as_view()(request, **kwargs)
+
+    def test_no_user(self):
+        """Before the user is loaded, the view shows the public pages."""
+
+        view = AsyncArticleArchiveView()
+        view.setup(self.factory.get('/news/'))
+        self.assertFalse(view.is_staff_preview())
+        self.assertEqual(view.get_queryset().count(), 1)
+
+    async def test_alive(self):
+        """Async version of live()."""
+
+        self.assertEqual(await Article.objects.alive(), [self.article1])
+        self.assertEqual(await Article.objects.alive(statuses=['draft']), [self.article2])
+
+    async def test_archive(self):
+        """The archive index view only shows live articles - except to staff."""
+
+        response = await self.get(AsyncArticleArchiveView)
+        self.assertEqual(response.context_data['article_list'], [self.article1])
+        self.assertEqual(response.context_data['date_list'], [datetime.date(2011, 1, 1)])
+
+        response = await self.get(AsyncArticleArchiveView, user=self.staff)
+        self.assertEqual(response.context_data['article_list'], [self.article2, self.article1])
+        self.assertEqual(response.context_data['date_list'], [datetime.date(2012, 1, 1), datetime.date(2011, 1, 1)])
+
+    async def test_detail(self):
+        """The detail view only shows live articles - except to staff."""
+
+        response = await self.get(AsyncArticleDetailView, slug='article-1')
+        self.assertEqual(response.context_data['article'], self.article1)
+
+        with self.assertRaises(Http404):
+            await self.get(AsyncArticleDetailView, slug='article-2')
+
+        response = await self.get(AsyncArticleDetailView, user=self.staff, slug='article-2')
+        self.assertEqual(response.context_data['article'], self.article2)
+
+
 class SitemapTest(TestCase):
 
     def setUp(self):
@@ -320,3 +1470,34 @@ class SitemapTest(TestCase):
         # Has the modified date - which will always be today.
         today_as_string = datetime.date.today().today().strftime('%Y-%m-%d')
         self.assertContains(response, f'<lastmod>{today_as_string}</lastmod>')
+
+    def test_index(self):
+        """The sitemap index shows the date of the latest change in each section."""
+        response = self.client.get('/sitemap-index.xml')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertContains(response, '<loc>http://example.com/sitemap-news.xml</loc>')
+        self.assertContains(response, f'<lastmod>{self.article1.modified.isoformat()}</lastmod>')
+
+    def test_section(self):
+        """A single section of the sitemap only loads the fields that it needs."""
+        with self.assertNumQueries(2):
+            response = self.client.get('/sitemap-news.xml')
+        self.assertContains(response, '<loc>http://example.com/news/test-article/</loc>')
+
+        article = response.context['urlset'][0]['item']
+        self.assertEqual(article.get_deferred_fields(), {'title', 'body', 'status', 'status_changed',
+                                                         'created', 'start', 'end'})
+
+    def test_chunks(self):
+        """Articles are read in chunks."""
+        for i in range(5):
+            ArticleFactory(title=f'Chunk {i}')
+
+        sitemap = NewsSitemap()
+        sitemap.minipub_chunk_size = 2
+        urls = sitemap.get_urls(page=1, site=Site(domain='example.com'), protocol='http')
+        self.assertEqual(len(urls), 6)
+        # Most recent articles first.
+        self.assertEqual(urls[0]['location'], 'http://example.com/news/chunk-4/')
+        self.assertEqual(urls[5]['location'], 'http://example.com/news/test-article/')
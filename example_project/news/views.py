@@ -1,10 +1,10 @@
-from minipub.views import MinipubArchiveIndexView, MinipubYearArchiveView, \
-    MinipubDetailView
+from minipub.views import CacheControlMixin, ConditionalGetMixin, DateListCacheMixin, \
+    MinipubArchiveIndexView, MinipubYearArchiveView, MinipubDetailView
 
 from .models import Article
 
 
-class ArticleArchiveView(MinipubArchiveIndexView):
+class ArticleArchiveView(CacheControlMixin, ConditionalGetMixin, DateListCacheMixin, MinipubArchiveIndexView):
     model = Article
     context_object_name = 'article_list'
     # Display page even if no content; this is convenience as in practice the
@@ -13,7 +13,7 @@ class ArticleArchiveView(MinipubArchiveIndexView):
     allow_empty = True
 
 
-class ArticleYearArchiveView(MinipubYearArchiveView):
+class ArticleYearArchiveView(CacheControlMixin, ConditionalGetMixin, DateListCacheMixin, MinipubYearArchiveView):
     model = Article
     context_object_name = 'article_list'
     date_list_period = 'year'
@@ -24,14 +24,11 @@ class ArticleYearArchiveView(MinipubYearArchiveView):
         a sidebar with *all* the years that have articles."""
 
         context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated and self.request.user.is_staff:
-            qs = self.model.objects.all()
-        else:
-            qs = self.model.objects.live()
-        context['date_list'] = qs.dates('start', 'year', order='DESC')
+        context['date_list'] = self.get_cached_dates(self.get_queryset(), 'year', order='DESC')
         return context
 
 
-class ArticleDetailView(MinipubDetailView):
+class ArticleDetailView(CacheControlMixin, ConditionalGetMixin, MinipubDetailView):
     model = Article
     context_object_name = 'article'
+    minipub_404_timeout = 60 * 10
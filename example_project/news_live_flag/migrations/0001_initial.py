@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('status', model_utils.fields.StatusField(choices=[('draft', 'draft'), ('published', 'published')], default='draft', max_length=100, no_check_for_status=True, verbose_name='status')),
+                ('status_changed', model_utils.fields.MonitorField(default=django.utils.timezone.now, monitor='status', verbose_name='status changed')),
+                ('start', models.DateField(blank=True, null=True, verbose_name='start date')),
+                ('end', models.DateField(blank=True, null=True, verbose_name='end date')),
+                ('live_flag', models.BooleanField(default=False, editable=False, verbose_name='live')),
+                ('title', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField()),
+                ('body', models.TextField()),
+            ],
+            options={
+                'abstract': False,
+                'default_manager_name': 'objects',
+                'indexes': [models.Index(fields=['status', 'start', 'end'], name='news_live_flag_article_live'), models.Index(fields=['live_flag', 'start'], name='news_live_flag_article_flag')],
+            },
+        ),
+    ]
@@ -0,0 +1,12 @@
+from django.db import models
+
+from minipub.models import MinipubLiveFlagModel
+
+
+class Article(MinipubLiveFlagModel):
+    title = models.CharField(unique=True, max_length=50)
+    slug = models.SlugField()
+    body = models.TextField()
+
+    def __str__(self):
+        return self.title
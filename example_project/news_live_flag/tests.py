@@ -0,0 +1,119 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import isolate_apps
+
+from minipub.models import MinipubLiveFlagModel
+
+from .factories import ArticleFactory
+from .models import Article
+
+"""
+Tests for the precomputed 'live' flag.
+
+"""
+
+
+class LiveFlagTest(TestCase):
+
+    def setUp(self):
+        self.article1 = ArticleFactory(title='Some news about me')
+
+    def test_save(self):
+        """The flag is set when the article is saved."""
+
+        self.assertEqual(self.article1.live_flag, True)
+        self.assertQuerySetEqual(Article.objects.live(),
+                                 ['<Article: Some news about me>'], transform=repr)
+
+        self.article1.status = Article.STATUS.draft
+        self.article1.save()
+        self.assertEqual(self.article1.live_flag, False)
+        self.assertQuerySetEqual(Article.objects.live(), [])
+
+        self.article1.status = Article.STATUS.published
+        self.article1.start = datetime.date(2999, 1, 1)
+        self.article1.save()
+        self.assertEqual(self.article1.live_flag, False)
+
+    def test_lookup(self):
+        """live() just checks the flag."""
+
+        where = str(Article.objects.live().query).split('WHERE')[1]
+        self.assertIn('"live_flag"', where)
+        self.assertNotIn('"start"', where)
+
+        # Other statuses do not use the flag.
+        where = str(Article.objects.live(statuses=['draft']).query).split('WHERE')[1]
+        self.assertNotIn('"live_flag"', where)
+
+        # Nor do other dates.
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        where = str(Article.objects.live(as_of=tomorrow).query).split('WHERE')[1]
+        self.assertNotIn('"live_flag"', where)
+
+    def test_refresh(self):
+        """Articles that reach their start or end date are updated by the refresh."""
+
+        article2 = ArticleFactory(title='article 2')
+        # Simulate the passing of time: dates are changed without saving the articles.
+        yesterday = datetime.date.today() - datetime.timedelta(days=1)
+        Article.objects.filter(pk=self.article1.pk).update(end=yesterday)
+        Article.objects.filter(pk=article2.pk).update(live_flag=False)
+
+        self.assertQuerySetEqual(Article.objects.live(),
+                                 ['<Article: Some news about me>'], transform=repr)
+
+        self.assertEqual(Article.objects.refresh_live_flag(), (1, 1))
+        self.assertQuerySetEqual(Article.objects.live(),
+                                 ['<Article: article 2>'], transform=repr)
+
+        # Nothing left to update.
+        self.assertEqual(Article.objects.refresh_live_flag(), (0, 0))
+
+    def test_transition(self):
+        """Bulk status changes update the flag."""
+
+        Article.objects.all().unpublish()
+        self.assertQuerySetEqual(Article.objects.live(), [])
+        Article.objects.all().publish()
+        self.assertQuerySetEqual(Article.objects.live(),
+                                 ['<Article: Some news about me>'], transform=repr)
+
+        ArticleFactory(title='Imported', status=Article.STATUS.draft, start=None)
+        self.assertEqual(Article.objects.filter(start__isnull=True).publish(), 1)
+        self.assertQuerySetEqual(Article.objects.live().order_by('title'),
+                                 ['<Article: Imported>', '<Article: Some news about me>'], transform=repr)
+
+    def test_command(self):
+        """The management command refreshes all models that have a live flag."""
+
+        Article.objects.filter(pk=self.article1.pk).update(live_flag=False)
+        out = StringIO()
+        call_command('minipub_refresh_live', stdout=out)
+        self.assertIn('news_live_flag.Article: 1 now live, 0 no longer live.', out.getvalue())
+        self.assertQuerySetEqual(Article.objects.live(),
+                                 ['<Article: Some news about me>'], transform=repr)
+
+
+class IndexNameTest(SimpleTestCase):
+
+    @isolate_apps('news_live_flag')
+    def test_long_names(self):
+        """Index names that would be too long for Django are shortened."""
+
+        class VeryLongModelNameForEditorialArticles(MinipubLiveFlagModel):
+            pass
+
+        names = [index.name for index in VeryLongModelNameForEditorialArticles._meta.indexes]
+        self.assertEqual(len(names), 2)
+        self.assertTrue(names[0].startswith('minipub_') and names[0].endswith('_live'))
+        self.assertTrue(names[1].startswith('minipub_') and names[1].endswith('_flag'))
+        self.assertTrue(all(len(name) <= 30 for name in names))
+        self.assertEqual(VeryLongModelNameForEditorialArticles.check(), [])
+
+        # Short names are not changed.
+        self.assertEqual([index.name for index in Article._meta.indexes],
+                         ['news_live_flag_article_live', 'news_live_flag_article_flag'])
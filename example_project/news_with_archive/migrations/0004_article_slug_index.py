@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news_with_archive', '0003_article_news_with_archive_article_live'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['slug', 'status', 'start', 'end'], name='news_with_archive_article_slug'),
+        ),
+    ]
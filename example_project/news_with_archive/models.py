@@ -13,6 +13,12 @@ class Article(MinipubModel):
     slug = models.SlugField()
     body = models.TextField()
 
+    class Meta(MinipubModel.Meta):
+        # The detail views look up a live article by slug: this index covers the whole query.
+        indexes = MinipubModel.Meta.indexes + [
+            models.Index(fields=['slug', 'status', 'start', 'end'], name='%(app_label)s_%(class)s_slug'),
+        ]
+
     def __str__(self):
         return self.title
 
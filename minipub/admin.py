@@ -27,14 +27,57 @@ And here is an example of using them:
         MinipubAdmin.PUBLICATION_FIELDSET,
         MinipubAdmin.TIMESTAMP_FIELDSET
     )
+
+The changelist
+--------------
+``MinipubAdmin`` provides a ``live`` column that can be added to ``list_display``; it is
+computed by the database for the whole page (rather than calling ``live()`` on each
+object), and the changelist can be sorted on it.
+
+There is also a filter to show the objects that are live, scheduled to go live, or
+expired. By default, these use the 'published' status; if your model has extra
+statuses, you can change this with the ``minipub_live`` attribute:
+
+.. code-block:: python
+
+    class ArticleAdmin(MinipubAdmin):
+        list_display = ('title', 'live', 'status', 'start')
+        minipub_live = ('published', 'archived')
 """
 from django.contrib import admin
 
 
+class LiveListFilter(admin.SimpleListFilter):
+    title = 'live'
+    parameter_name = 'live'
+
+    def __init__(self, request, params, model, model_admin):
+        self.statuses = model_admin.minipub_live
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return (
+            ('live', 'Live'),
+            ('scheduled', 'Scheduled'),
+            ('expired', 'Expired'),
+        )
+
+    def queryset(self, request, queryset):
+        now = queryset.model.minipub_now()
+        if self.value() == 'live':
+            return queryset.live(statuses=self.statuses)
+        if self.value() == 'scheduled':
+            return queryset.filter(status__in=self.statuses, start__gt=now)
+        if self.value() == 'expired':
+            return queryset.filter(status__in=self.statuses, end__lt=now)
+
+
 class MinipubAdmin(admin.ModelAdmin):
 
     readonly_fields = ('created', 'modified', 'status_changed')
     ordering = ['-start']
+    list_filter = (LiveListFilter, 'status')
+    minipub_live = ('published',)
 
     TIMESTAMP_FIELDSET = ('Timestamps', {
         'description': 'When this record was created, last modified, and when '
@@ -52,3 +95,10 @@ class MinipubAdmin(admin.ModelAdmin):
         "this object in the website, even if it's not published.",
         'fields': (('status', 'start', 'end'),)
     })
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_live(statuses=self.minipub_live)
+
+    @admin.display(boolean=True, ordering='is_live', description='live')
+    def live(self, obj):
+        return obj.is_live
@@ -0,0 +1,157 @@
+"""
+.. _caching-label:
+
+Minipub can cache the list of live objects, using the
+`Django cache framework <https://docs.djangoproject.com/en/dev/topics/cache/>`_:
+
+.. code-block:: python
+
+    articles = Article.objects.order_by('-start').live_cached()
+
+``live_cached()`` accepts the same ``statuses`` argument as ``live()``, but it returns a
+list rather than a queryset - so it should be the last call in the chain.
+
+The cache is keyed by model, the query (including the statuses and today's date) and
+a per-model 'generation' that changes every time an object of that model is saved or
+deleted - so there is no risk of showing stale content. For a ``MinipubDateTimeModel``,
+the current time (rounded down to its ``minipub_resolution``) is used rather than today's
+date.
+
+Settings
+--------
+By default, minipub uses the ``default`` cache. You can use another one with the
+``MINIPUB_CACHE`` setting; for example, a local-memory cache gives you a per-process
+cache with LRU eviction:
+
+.. code-block:: python
+
+    CACHES = {
+        'default': {...},
+        'minipub': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        },
+    }
+
+    MINIPUB_CACHE = 'minipub'
+
+Template fragments
+------------------
+Parts of a template can be cached with the ``{% minipub_cache %}`` tag. It works like
+Django's ``{% cache %}`` tag, but it knows about minipub objects:
+
+.. code-block:: django
+
+    {% load minipub_tags %}
+
+    {% for article in article_list %}
+        {% minipub_cache 3600 teaser article %}
+            ...
+            {% if article.staff_preview %}This is a preview{% endif %}
+        {% endminipub_cache %}
+    {% endfor %}
+
+The cache key of the fragment is built from:
+
+- for each minipub object: its ``modified`` timestamp and its ``status``;
+- for each minipub queryset: its query and the model's cache generation - so for example
+  a list of articles is refreshed whenever an article is saved or deleted;
+- the current date (or for a ``MinipubDateTimeModel``, the current time rounded down to its
+  ``minipub_resolution``) - so fragments do not outlive the day on which an object goes
+  live or expires;
+- whether the user sees :ref:`staff previews<staff-preview-label>`: previews are cached
+  separately, and are never shown to the public. This is the ``minipub_staff_preview``
+  context variable, which minipub views set from their ``minipub_preview`` policy; in
+  other views, set it yourself - without it, the fragment is not cached.
+
+Any other values are used as they are, same as for ``{% cache %}``.
+
+.. note::
+
+    Changes made with ``QuerySet.update()`` do not send any signals, so they
+    will not invalidate the cache. Call ``minipub.caching.invalidate(Article)``
+    after them.
+
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Model, QuerySet
+
+logger = logging.getLogger('minipub')
+
+
+def get_cache():
+    return caches[getattr(settings, 'MINIPUB_CACHE', 'default')]
+
+
+def _generation_key(model):
+    return f'minipub:{model._meta.concrete_model._meta.label_lower}:generation'
+
+
+def get_generation(model):
+    """Return the current cache generation for this model - the time (in ns) of its last change."""
+    cache = get_cache()
+    key = _generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from a timestamp rather than from 1: if the generation gets evicted from the
+        # cache, we must not go back to a value that older entries might have been stored under.
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate(model):
+    """Invalidate all cached entries for this model."""
+    try:
+        get_cache().set(_generation_key(model), time.time_ns(), None)
+    except Exception:
+        # A cache outage must not break saving objects.
+        logger.exception('Could not invalidate the minipub cache of %s.', model._meta.label)
+
+
+def _key_part(part):
+    try:
+        return str(part)
+    except EmptyResultSet:
+        # The SQL of a ``none()`` queryset cannot be built.
+        return 'empty'
+
+
+def make_key(model, *parts):
+    """Build a cache key for this model, valid for today (or the current ``minipub_resolution``
+    step) and for the current generation only."""
+    digest = hashlib.md5(':'.join(_key_part(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+    return ':'.join([
+        'minipub',
+        model._meta.concrete_model._meta.label_lower,
+        str(get_generation(model)),
+        model.minipub_now().isoformat(),
+        digest,
+    ])
+
+
+def _fragment_part(value):
+    # Imported here, as the models use this module.
+    from .models import MinipubModel
+    if isinstance(value, MinipubModel):
+        label = value._meta.label_lower
+        return f'{label}:{value.pk}:{value.modified.isoformat()}:{value.status}:{value.minipub_now()}'
+    if isinstance(value, QuerySet) and issubclass(value.model, MinipubModel):
+        model = value.model
+        return f'{model._meta.label_lower}:{get_generation(model)}:{model.minipub_now()}:{_key_part(value.query)}'
+    if isinstance(value, Model):
+        return f'{value._meta.label_lower}:{value.pk}'
+    return str(value)
+
+
+def make_fragment_key(fragment_name, vary_on=(), staff=False):
+    """Build the cache key of a template fragment - see ``{% minipub_cache %}``."""
+    digest = hashlib.md5(':'.join(_fragment_part(value) for value in vary_on).encode(),
+                         usedforsecurity=False).hexdigest()
+    return ':'.join(['minipub', 'fragment', 'staff' if staff else 'public', fragment_name, digest])
@@ -0,0 +1,107 @@
+"""
+.. _instrumentation-label:
+
+To find out how much time your minipub pages spend in the database, add the
+``InstrumentationMixin`` to your views:
+
+.. code-block:: python
+
+    from minipub.instrumentation import InstrumentationMixin
+    from minipub.views import MinipubDetailView
+
+    class ArticleDetailView(InstrumentationMixin, MinipubDetailView):
+        ...
+
+For each request, minipub records:
+
+- the number of database queries, and the time spent running them (including the
+  queries run while rendering the template).
+- the total time taken by the view.
+- the number of objects displayed.
+- whether the public or the staff preview version of the page was shown.
+
+These are added to the response in a ``Server-Timing`` header - your browser's
+developer tools will display them - and logged to the ``minipub`` logger. They are also
+sent with the ``minipub.signals.instrumented`` signal, if you want to collect them
+yourself.
+
+Sitemaps can also be instrumented, by setting ``minipub_instrument = True`` on your
+``MinipubSitemap`` class; the statistics are logged and sent with the signal.
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.db.models.query import QuerySet
+
+from .signals import instrumented
+from .views import GetQuerysetMixin
+
+logger = logging.getLogger('minipub')
+
+
+class QueryRecorder:
+    """Context manager that counts the database queries run inside it, and their duration."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        begin = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - begin
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        self._begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total_time = time.perf_counter() - self._begin
+        self._stack.close()
+
+    def report(self, sender, label, rows, branch):
+        """Log the statistics and send the ``instrumented`` signal."""
+        logger.info('%s: %d queries in %.1fms, total %.1fms, %s rows, %s branch',
+                    label, self.queries, self.sql_time * 1000, self.total_time * 1000, rows, branch)
+        instrumented.send(sender=sender, label=label, queries=self.queries, sql_time=self.sql_time,
+                          total_time=self.total_time, rows=rows, branch=branch)
+
+
+class InstrumentationMixin(GetQuerysetMixin):
+
+    def dispatch(self, request, *args, **kwargs):
+        with QueryRecorder() as recorder:
+            response = super().dispatch(request, *args, **kwargs)
+            # Querysets are usually evaluated by the template.
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+
+        branch = 'staff' if self.is_staff_preview() else 'public'
+        recorder.report(type(self), request.path, self.get_row_count(response), branch)
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;desc="{recorder.queries} queries";dur={recorder.sql_time * 1000:.1f}',
+            f'total;dur={recorder.total_time * 1000:.1f}',
+            f'minipub;desc="{branch}"',
+        ])
+        return response
+
+    def get_row_count(self, response):
+        """The number of objects displayed - or ``None`` if it is not known without another query."""
+        context = getattr(response, 'context_data', None) or {}
+        if context.get('object') is not None:
+            return 1
+        object_list = context.get('object_list')
+        if isinstance(object_list, QuerySet):
+            return len(object_list) if object_list._result_cache is not None else None
+        if object_list is not None:
+            return len(object_list)
+        return None
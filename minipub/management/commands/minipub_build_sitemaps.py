@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from minipub.sitemaps import write_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemaps listed in the MINIPUB_SITEMAPS setting to MINIPUB_SITEMAP_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--protocol', default=None,
+                            help="Protocol used in the urls (default: 'https').")
+        parser.add_argument('--force', action='store_true',
+                            help='Write all sections, even if they have not changed.')
+
+    def handle(self, *args, **options):
+        sitemaps = import_string(settings.MINIPUB_SITEMAPS)
+        written = write_sitemaps(sitemaps, settings.MINIPUB_SITEMAP_ROOT,
+                                 protocol=options['protocol'], force=options['force'])
+        self.stdout.write(f'Sections written: {", ".join(written) or "none"}.')
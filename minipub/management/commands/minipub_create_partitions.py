@@ -0,0 +1,34 @@
+import datetime
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from minipub.partitioning import create_partitions_sql
+
+
+class Command(BaseCommand):
+    help = 'Create the start date partitions of a model for the current and coming periods (PostgreSQL only).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='The model, as app_label.ModelName.')
+        parser.add_argument('--interval', choices=('year', 'month'), default='year')
+        parser.add_argument('--ahead', type=int, default=1,
+                            help='Number of years to create in advance (default: 1).')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        connection = connections[router.db_for_write(model)]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning is only available with PostgreSQL.')
+
+        year = datetime.date.today().year
+        statements = create_partitions_sql(model._meta.db_table, connection.ops.quote_name,
+                                           year, year + options['ahead'], options['interval'])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        self.stdout.write(f'Partitions of {model._meta.db_table} created up to {year + options["ahead"]}.')
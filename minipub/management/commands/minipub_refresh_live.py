@@ -0,0 +1,15 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from minipub.models import MinipubLiveFlagModel
+
+
+class Command(BaseCommand):
+    help = "Update the 'live' flag of objects that have reached their start or end date."
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            if not issubclass(model, MinipubLiveFlagModel):
+                continue
+            went_live, expired = model._default_manager.refresh_live_flag()
+            self.stdout.write(f'{model._meta.label}: {went_live} now live, {expired} no longer live.')
@@ -0,0 +1,48 @@
+import datetime
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from minipub.models import MinipubModel
+from minipub.scheduler import tick
+
+
+class Command(BaseCommand):
+    help = 'Send the minipub_went_live and minipub_expired signals for the objects that have gone live or expired.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*',
+                            help='The models, as app_label.ModelName (default: all minipub models).')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help="A status that can be live (default: 'published'); can be repeated.")
+        parser.add_argument('--since', type=datetime.date.fromisoformat,
+                            help='Report the changes since this date (YYYY-MM-DD), rather than since the last run.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep running.')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='With --loop, the number of seconds between checks (default: 300).')
+
+    def handle(self, *args, **options):
+        try:
+            models = [apps.get_model(label) for label in options['models']]
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        if not models:
+            models = [model for model in apps.get_models() if issubclass(model, MinipubModel)]
+        statuses = options['statuses'] or ['published']
+        if not getattr(settings, 'MINIPUB_SCHEDULER_STATE', None) and (options['loop'] or not options['since']):
+            raise CommandError('Set MINIPUB_SCHEDULER_STATE so that the last run can be remembered, '
+                               'or give an explicit --since date.')
+
+        since = options['since']
+        while True:
+            for model in models:
+                went_live, expired = tick(model, statuses, since, options['batch_size'])
+                if went_live or expired or options['verbosity'] > 1:
+                    self.stdout.write(f'{model._meta.label}: {went_live} went live, {expired} expired.')
+            if not options['loop']:
+                break
+            since = None
+            time.sleep(options['interval'])
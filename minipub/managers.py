@@ -1,13 +1,222 @@
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.db.models.query import QuerySet
-from django.db.models import Q
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import BooleanField, Case, Count, Exists, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
+import collections
 import datetime
 
+from . import caching, routing
+
 
 class MinipubQuerySet(QuerySet):
 
-    def live(self, statuses=['published']):
-        today = datetime.date.today()
+    def live(self, statuses=['published'], as_of=None):
+        """Filter on the objects that are live today - or on the ``as_of`` date."""
+        now = self.model.minipub_now() if as_of is None else as_of
         return self.filter(status__in=statuses).\
-            filter(Q(start__lte=today) | Q(start__isnull=True)).\
-            filter(Q(end__gte=today) | Q(end__isnull=True))
+            filter(Q(start__lte=now) | Q(start__isnull=True)).\
+            filter(Q(end__gte=now) | Q(end__isnull=True))
+
+    def using_replica(self):
+        """Read from the replica database, if one is configured - see
+        :ref:`database routing<routing-label>`."""
+        alias = routing.get_replica(self.model)
+        return self.using(alias) if alias else self
+
+    async def alive(self, statuses=['published']):
+        """Async version of ``live()`` - returns the list of live objects."""
+        return [obj async for obj in self.live(statuses=statuses)]
+
+    def with_live(self, statuses=['published'], as_of=None):
+        """Annotate each object with ``is_live``, computed by the database.
+
+        Useful when displaying a list of objects: all of them are checked against the
+        same date, and there is no need to call ``live()`` on each of them.
+        """
+        now = self.model.minipub_now() if as_of is None else as_of
+        started = Q(start__lte=now) | Q(start__isnull=True)
+        not_ended = Q(end__gte=now) | Q(end__isnull=True)
+        return self.annotate(is_live=Case(
+            When(Q(status__in=statuses) & started & not_ended, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+
+    def live_counts(self, dates, statuses=['published']):
+        """Return a dictionary of the number of live objects on each of ``dates``.
+
+        This uses a single query, grouped by start and end dates, whatever the number of
+        dates - rather than one ``live().count()`` query per date.
+
+        For a ``MinipubDateTimeModel``, ``dates`` can be dates or datetimes; a date counts
+        the objects that are live at the start of that day. The returned dictionary is keyed
+        by the values that were passed in.
+        """
+        from .models import as_datetime  # models imports this module.
+
+        # Each (start, end) pair adds its objects to the count on its start date, and
+        # removes them after its end date.
+        changes = collections.Counter()
+        initial = 0
+        periods = self.filter(status__in=statuses).order_by().values_list('start', 'end').annotate(count=Count('pk'))
+        for start, end, count in periods:
+            if start is None:
+                initial += count
+            else:
+                changes[start] += count
+            if end is not None:
+                changes[end + self.model.minipub_resolution] -= count
+        boundaries = sorted(changes.items())
+        counts = {}
+        live = initial
+        position = 0
+        if isinstance(self.model.minipub_now(), datetime.datetime):
+            normalise = as_datetime
+        else:
+            normalise = None
+        for date in sorted(dates, key=normalise):
+            moment = normalise(date) if normalise else date
+            while position < len(boundaries) and boundaries[position][0] <= moment:
+                live += boundaries[position][1]
+                position += 1
+            counts[date] = live
+        return counts
+
+    def next_boundary(self, statuses=['published']):
+        """Return the next date (after today) on which an object will enter or leave the
+        live window, or ``None`` if there is no such date.
+
+        For a ``MinipubDateTimeModel``, this is the next time rather than the next date.
+        """
+        now = self.model.minipub_now()
+        dates = self.filter(status__in=statuses).aggregate(
+            start=Min('start', filter=Q(start__gt=now)),
+            end=Min('end', filter=Q(end__gte=now)))
+        boundaries = []
+        if dates['start']:
+            boundaries.append(dates['start'])
+        if dates['end']:
+            # Objects are still live on their end date.
+            boundaries.append(dates['end'] + self.model.minipub_resolution)
+        return min(boundaries, default=None)
+
+    def transition(self, to_status):
+        """Change the status of all the objects in this queryset, using a single ``UPDATE``
+        statement rather than saving each object.
+
+        Same as for ``save()``, objects that are not draft get a start date of today if
+        they do not have one, and the ``status_changed`` and ``modified`` timestamps are
+        updated (only for objects whose status actually changes).
+        Returns the number of objects changed.
+        """
+        qs = self.exclude(status=to_status)
+        log = self.model.get_minipub_log()
+        if log is not None:
+            changes = list(qs.values_list('pk', 'start', 'end'))
+        start = self.model.minipub_now() if to_status != self.model.STATUS.draft else None
+        now = timezone.now()
+        fields = {'status': to_status, 'status_changed': now, 'modified': now}
+        if start is not None:
+            # In the same statement: a separate UPDATE could stop the objects from matching
+            # the filters of this queryset, e.g. ``start__isnull=True``.
+            fields['start'] = Coalesce('start', Value(start))
+        count = qs.update(**fields)
+        if count:
+            caching.invalidate(self.model)
+        if log is not None:
+            log.objects.record(self.model, ((pk, to_status, old_start or start, end)
+                                            for pk, old_start, end in changes))
+        return count
+
+    def publish(self):
+        return self.transition(self.model.STATUS.published)
+
+    def unpublish(self):
+        return self.transition(self.model.STATUS.draft)
+
+    def live_on(self, when, statuses=['published']):
+        """Return the objects that were live on a given date (or for a ``MinipubDateTimeModel``,
+        at a given time), according to the transition log.
+
+        For a date, the state of the objects at the end of that day is used.
+        """
+        log = self.model.get_minipub_log()
+        if log is None:
+            raise ImproperlyConfigured(f'{self.model.__name__} does not have a minipub_log.')
+        if isinstance(when, datetime.datetime):
+            entries = log.objects.filter(changed__lte=when)
+        else:
+            end_of_day = datetime.datetime.combine(when + datetime.timedelta(days=1), datetime.time.min)
+            if settings.USE_TZ:
+                end_of_day = timezone.make_aware(end_of_day)
+            entries = log.objects.filter(changed__lt=end_of_day)
+        # For each object, a single lookup on the (object_id, changed) index finds its last
+        # entry - so the cost grows with the number of objects, not with the length of the log.
+        last = entries.filter(object_id=OuterRef(OuterRef('pk'))).order_by('-changed', '-pk').values('pk')[:1]
+        codes = self.model.minipub_status_codes()
+        current = log.objects.filter(pk=Subquery(last), status__in=[codes[status] for status in statuses]).\
+            filter(Q(start__lte=when) | Q(start__isnull=True)).\
+            filter(Q(end__gte=when) | Q(end__isnull=True))
+        return self.filter(Exists(current))
+
+    def live_cached(self, statuses=['published'], timeout=DEFAULT_TIMEOUT):
+        """Same as ``live()``, but returns a list of objects that is cached - see
+        :ref:`caching<caching-label>`."""
+        qs = self.live(statuses=statuses)
+        key = caching.make_key(self.model, tuple(statuses), qs.query)
+        cache = caching.get_cache()
+        objects = cache.get(key)
+        if objects is None:
+            objects = list(qs)
+            cache.set(key, objects, timeout)
+        return objects
+
+
+class MinipubLiveFlagQuerySet(MinipubQuerySet):
+    """Queryset for models with a precomputed ``live_flag`` - see ``MinipubLiveFlagModel``."""
+
+    def live(self, statuses=['published'], as_of=None):
+        # The flag is only valid for today, and for the statuses that it was computed for.
+        if as_of is None and tuple(statuses) == tuple(self.model.LIVE_FLAG_STATUSES):
+            return self.filter(live_flag=True)
+        return super().live(statuses=statuses, as_of=as_of)
+
+    def transition(self, to_status):
+        count = super().transition(to_status)
+        if count:
+            # The filters on this queryset may no longer match the objects that changed.
+            self.model._default_manager.all().refresh_live_flag()
+        return count
+
+    def refresh_live_flag(self):
+        """Update the ``live_flag`` of the objects that have entered or left the live window
+        since the last refresh.
+
+        Only the rows whose flag is out of date are touched, using 2 ``UPDATE`` statements.
+        Returns a tuple of the number of objects that went live, and that stopped being live.
+        """
+        now = self.model.minipub_now()
+        statuses = self.model.LIVE_FLAG_STATUSES
+        went_live = super().live(statuses=statuses).filter(live_flag=False).update(live_flag=True)
+        expired = self.filter(live_flag=True).\
+            filter(~Q(status__in=statuses) | Q(start__gt=now) | Q(end__lt=now)).\
+            update(live_flag=False)
+        if went_live or expired:
+            caching.invalidate(self.model)
+        return went_live, expired
+
+
+class MinipubLogQuerySet(QuerySet):
+    """Queryset for the transition log - see ``MinipubLogModel``."""
+
+    def record(self, model, changes, batch_size=1000):
+        """Append entries to the log, in batches; ``changes`` is an iterable of
+        ``(object_id, status, start, end)``."""
+        codes = model.minipub_status_codes()
+        now = timezone.now()
+        return self.bulk_create((self.model(object_id=pk, status=codes[status], start=start, end=end, changed=now)
+                                 for pk, status, start, end in changes), batch_size=batch_size)
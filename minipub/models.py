@@ -38,26 +38,177 @@ or
 
     can_be_viewed = article1.live()
 
+When displaying a list of objects, you can also let the database work out which ones
+are live - each object gets an ``is_live`` attribute:
+
+.. code-block:: python
+
+    for article in Article.objects.with_live():
+        print(article.is_live)
+
+Other dates
+~~~~~~~~~~~
+``live()`` and ``with_live()`` accept an ``as_of`` date, e.g. to preview the website, or to
+warm up a cache for tomorrow:
+
+.. code-block:: python
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    Article.objects.live(as_of=tomorrow)
+    article1.live(as_of=tomorrow)
+
+Note that the status used is the current one - to find out what was live in the past, use
+the :ref:`transition log<transition-log-label>`.
+
+To count the live objects on many dates - e.g. for a daily report over several years - use
+``live_counts()``. It runs a single query, grouped by start and end dates (which the minipub
+index covers), rather than one query per date:
+
+.. code-block:: python
+
+    days = [first_day + datetime.timedelta(days=n) for n in range(365 * 5)]
+    counts = Article.objects.live_counts(days)  # {date: number of live articles}
+
+For a ``MinipubDateTimeModel``, dates count the objects that are live at midnight, in the
+current time zone.
+
+Bulk changes
+~~~~~~~~~~~~
+To change the status of many objects at once, use the ``publish()``, ``unpublish()`` or
+``transition(to_status)`` queryset methods rather than ``update()`` - they set the
+start date and the timestamps the same way as ``save()`` would:
+
+.. code-block:: python
+
+    Article.objects.filter(pk__in=imported_ids).publish()
+
 Extra statuses
 ~~~~~~~~~~~~~~
 Models can have more statuses than ``draft``, ``published`` -
 :ref:`see here for more details<extra_statuses-label>`.
 
+Database index
+~~~~~~~~~~~~~~
+``MinipubModel`` declares a composite index on ``(status, start, end)`` - the fields
+filtered on by ``live()`` - and it will be created by your migrations.
+If your model defines its own ``Meta`` class, inherit from the minipub one so as to keep
+this index:
+
+.. code-block:: python
+
+    class Article(MinipubModel):
+        ...
+
+        class Meta(MinipubModel.Meta):
+            ordering = ['-start']
+
+The index is named ``<app_label>_<model name>_live``. Django limits index names to 30
+characters, so if your app label and model name are too long, the index is named
+``minipub_<hash>_live`` instead - the hash is computed from the app label and model name,
+so the name does not change between runs. The same applies to the other minipub indexes,
+and to your own indexes on minipub models named with ``%(app_label)s_%(class)s_...``.
+
+Precomputed 'live' flag
+~~~~~~~~~~~~~~~~~~~~~~~
+On very large tables, you can use ``MinipubLiveFlagModel`` instead of ``MinipubModel``.
+It stores whether an object is live in an indexed ``live_flag`` field, so that
+``live()`` becomes a simple ``live_flag = true`` lookup.
+
+The flag is updated every time an object is saved; objects whose start or end date
+is reached are updated by the ``minipub_refresh_live`` management command - so you
+should run it every day just after midnight, e.g. from a cron job::
+
+    python manage.py minipub_refresh_live
+
+The flag is only computed for the statuses listed in ``LIVE_FLAG_STATUSES`` (by default,
+``('published',)``); ``live()`` called with any other statuses falls back to filtering
+on the start and end dates.
+
+Start and end times
+~~~~~~~~~~~~~~~~~~~
+If objects need to go live at a given time of the day, use ``MinipubDateTimeModel``
+instead of ``MinipubModel``: ``start`` and ``end`` are then timezone-aware datetimes.
+
+``live()`` compares them to the current time rounded down to the minute, and ``start`` and
+``end`` are also rounded down to the minute when an object is saved. So the list of live
+objects only changes once a minute at most, and the minipub caches, ``ETag`` and
+``Cache-Control`` headers can still be used: they expire on the minute when the next object
+goes live or expires, rather than at midnight. This resolution can be changed with the
+``minipub_resolution`` attribute:
+
+.. code-block:: python
+
+    from minipub.models import MinipubDateTimeModel
+
+    class Event(MinipubDateTimeModel):
+        minipub_resolution = datetime.timedelta(minutes=5)
+        ...
+
+.. _transition-log-label:
+
+Transition log
+~~~~~~~~~~~~~~
+``MinipubModel`` only stores the latest ``status_changed`` timestamp. To keep the full
+publication history of a model, declare a log model and point to it with ``minipub_log``:
+
+.. code-block:: python
+
+    from minipub.models import MinipubLogModel, MinipubModel
+
+    class Article(MinipubModel):
+        minipub_log = 'news.ArticleLog'
+        ...
+
+    class ArticleLog(MinipubLogModel):
+        pass
+
+A new entry is appended to the log every time the status, start or end date of an
+object changes - when it is saved, or in bulk (one ``INSERT`` per 1000 objects) when using
+``transition()``, ``publish()`` or ``unpublish()``. Changes made with ``update()`` are not
+logged.
+
+The log is compact: it stores the object's id rather than a foreign key (so entries are
+kept when objects are deleted), and the status as a small integer - its position in
+``STATUS``. So new statuses must be added at the end of ``STATUS``.
+For a ``MinipubDateTimeModel``, the ``start`` and ``end`` fields of the log model must be
+redeclared as ``DateTimeField``.
+
+The log can tell which objects were live at a given date:
+
+.. code-block:: python
+
+    Article.objects.live_on(datetime.date(2024, 1, 31))
+
+For each object, its last entry before that date is found with a single lookup on the
+log's index on ``(object_id, changed)`` - so the query grows with the number of objects,
+not with the length of their history.
+
+Caching
+~~~~~~~
+The list of live objects can be cached - :ref:`see here for more details<caching-label>`.
+
 Sitemaps
 ~~~~~~~~
 If you have defined a sitemap.xml, refer also to the :ref:`sitemaps page<sitemaps-label>`.
 
 """
 
+from django.apps import apps
 from django.db import models
+from django.db.models.signals import class_prepared, post_delete, post_save
+from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.conf import settings
+from django.utils import timezone
 
 from model_utils.models import StatusModel, TimeStampedModel
 from model_utils import Choices
 
 import datetime
+import hashlib
 
-from .managers import MinipubQuerySet
+from . import caching
+from .managers import MinipubLogQuerySet, MinipubQuerySet, MinipubLiveFlagQuerySet
 
 
 class MinipubModel(StatusModel, TimeStampedModel):
@@ -68,27 +219,66 @@ class MinipubModel(StatusModel, TimeStampedModel):
 
     objects = MinipubQuerySet.as_manager()
 
+    # The start and end dates are compared to today's date; objects are still live on their end date.
+    minipub_resolution = datetime.timedelta(days=1)
+
+    # The transition log model, as 'app_label.ModelName' - see ``MinipubLogModel``.
+    minipub_log = None
+
     class Meta:
         abstract = True
         default_manager_name = 'objects'
+        # Covers the filters used by ``live()``. Concrete models that declare their
+        # own ``Meta`` should inherit from ``MinipubModel.Meta`` to keep it.
+        indexes = [
+            models.Index(fields=['status', 'start', 'end'], name='%(app_label)s_%(class)s_live'),
+        ]
 
     def save(self, *args, **kwargs):
         """Set the start date for non-draft items if it hasn't been set already."""
         if self.status != self.STATUS.draft and self.start is None:
-            self.start = datetime.date.today()
+            self.start = self.minipub_now()
         super().save(*args, **kwargs)
+        if self.minipub_log is not None:
+            state = (self.status, self.start, self.end)
+            if state != getattr(self, '_minipub_logged', None):
+                self.get_minipub_log().objects.record(type(self), [(self.pk, *state)])
+                self._minipub_logged = state
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.minipub_log is not None:
+            # Remember the logged state, so that saving an unchanged object does not log it again.
+            instance._minipub_logged = tuple(instance.__dict__.get(name) for name in ('status', 'start', 'end'))
+        return instance
+
+    @classmethod
+    def get_minipub_log(cls):
+        return apps.get_model(cls.minipub_log) if cls.minipub_log is not None else None
+
+    @classmethod
+    def minipub_status_codes(cls):
+        """Map each status to the small integer stored in the transition log."""
+        return {status: code for code, (status, _) in enumerate(cls.STATUS)}
+
+    @classmethod
+    def minipub_now(cls):
+        """The current date, as compared to the start and end dates by ``live()``."""
+        return datetime.date.today()
 
     def clean(self):
         super().clean()
         if self.start and self.end and self.start > self.end:
             raise ValidationError('The end date cannot be before the start date.')
 
-    def live(self, statuses=['published']):
+    def live(self, statuses=['published'], as_of=None):
         if self.status not in statuses:
             return False
-        if self.start and self.start > datetime.date.today():
+        now = self.minipub_now() if as_of is None else as_of
+        if self.start and self.start > now:
             return False
-        if self.end and self.end < datetime.date.today():
+        if self.end and self.end < now:
             return False
         return True
 
@@ -113,3 +303,107 @@ class MinipubModel(StatusModel, TimeStampedModel):
         """
 
         return self.status == self.STATUS.draft
+
+
+class MinipubLiveFlagModel(MinipubModel):
+    """A ``MinipubModel`` that stores a precomputed 'live' flag."""
+
+    LIVE_FLAG_STATUSES = ('published',)
+
+    live_flag = models.BooleanField('live', default=False, editable=False)
+
+    objects = MinipubLiveFlagQuerySet.as_manager()
+
+    class Meta(MinipubModel.Meta):
+        abstract = True
+        indexes = MinipubModel.Meta.indexes + [
+            models.Index(fields=['live_flag', 'start'], name='%(app_label)s_%(class)s_flag'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # A missing start date would be set to today, which does not change the outcome.
+        self.live_flag = self.live(statuses=self.LIVE_FLAG_STATUSES)
+        super().save(*args, **kwargs)
+
+
+class MinipubDateTimeModel(MinipubModel):
+    """A ``MinipubModel`` with a start and end time, rather than a start and end date."""
+
+    start = models.DateTimeField('start time', null=True, blank=True)
+    end = models.DateTimeField('end time', null=True, blank=True)
+
+    minipub_resolution = datetime.timedelta(minutes=1)
+
+    class Meta(MinipubModel.Meta):
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.start = self.minipub_round(self.start)
+        self.end = self.minipub_round(self.end)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def minipub_round(cls, value):
+        """Round a datetime down to ``minipub_resolution``."""
+        if value is None:
+            return None
+        epoch = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc if timezone.is_aware(value) else None)
+        return value - (value - epoch) % cls.minipub_resolution
+
+    @classmethod
+    def minipub_now(cls):
+        """The current time, rounded down to ``minipub_resolution``."""
+        return cls.minipub_round(timezone.now())
+
+
+class MinipubLogModel(models.Model):
+    """An append-only log of the status, start and end of the objects of a minipub model."""
+
+    object_id = models.PositiveBigIntegerField()
+    # The position of the status in the model's ``STATUS``.
+    status = models.PositiveSmallIntegerField()
+    start = models.DateField(null=True, blank=True)
+    end = models.DateField(null=True, blank=True)
+    changed = models.DateTimeField()
+
+    objects = MinipubLogQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['object_id', 'changed'], name='%(app_label)s_%(class)s_obj'),
+        ]
+
+
+def as_datetime(value):
+    """Return the time at which a start or end date (or time) begins."""
+    if isinstance(value, datetime.datetime):
+        return value
+    value = datetime.datetime.combine(value, datetime.time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+@receiver(class_prepared)
+def shorten_index_names(sender, **kwargs):
+    """Shorten the '%(app_label)s_%(class)s_...' index names that Django would reject as
+    too long."""
+    if not issubclass(sender, (MinipubModel, MinipubLogModel)) or sender._meta.abstract:
+        return
+    prefix = f'{sender._meta.app_label.lower()}_{sender._meta.model_name}_'
+    digest = hashlib.md5(prefix.encode(), usedforsecurity=False).hexdigest()[:8]
+    for index in sender._meta.indexes:
+        if len(index.name) > index.max_name_length and index.name.startswith(prefix):
+            index.name = f'minipub_{digest}_{index.name[len(prefix):]}'[:index.max_name_length]
+
+
+def invalidate_cache(sender, **kwargs):
+    """Any change to a minipub object invalidates the cached entries for its model."""
+    caching.invalidate(sender)
+
+
+@receiver(class_prepared)
+def connect_invalidate_cache(sender, **kwargs):
+    """Only minipub models invalidate the cache when saved or deleted."""
+    if issubclass(sender, MinipubModel) and not sender._meta.abstract:
+        post_save.connect(invalidate_cache, sender=sender)
+        post_delete.connect(invalidate_cache, sender=sender)
@@ -0,0 +1,111 @@
+"""
+.. _partitioning-label:
+
+Very large tables can be split into `partitions
+<https://www.postgresql.org/docs/current/ddl-partitioning.html>`_ by ``start`` date, when
+using PostgreSQL. A query on a range of start dates - such as a year archive page - will
+then only read the relevant partitions.
+
+Django cannot create a partitioned table by itself, so this needs a little work:
+
+1. The table has to be created as partitioned, with a ``RunSQL`` operation in your
+   migration (``CREATE TABLE ... PARTITION BY RANGE (start)``). Note that PostgreSQL
+   requires the primary key and unique constraints of a partitioned table to include
+   the partition key.
+2. Then create the partitions with the ``CreateStartPartitions`` migration operation:
+
+   .. code-block:: python
+
+       from minipub.partitioning import CreateStartPartitions
+
+       class Migration(migrations.Migration):
+
+           operations = [
+               CreateStartPartitions('article', first_year=2010, last_year=2027),
+           ]
+
+   Each partition is named after the table and the period it covers (e.g.
+   ``news_article_2024``, or ``news_article_2024_05`` for monthly partitions). A
+   ``<table>_default`` partition is also created; it receives the objects without a
+   start date, as well as those outside of the partitions.
+3. Finally, run the ``minipub_create_partitions`` management command regularly (e.g.
+   once a month, from a cron job) so that partitions for the coming periods exist
+   before they are needed::
+
+       python manage.py minipub_create_partitions news.Article --interval year --ahead 1
+
+On other databases, the migration operation does nothing.
+"""
+import datetime
+
+from django.db.migrations.operations.base import Operation
+
+
+def get_periods(first_year, last_year, interval='year'):
+    """Yield ``(suffix, start, end)`` for each period; ``end`` is excluded from the period."""
+    if interval not in ('year', 'month'):
+        raise ValueError(f"interval must be 'year' or 'month', not '{interval}'.")
+    for year in range(first_year, last_year + 1):
+        if interval == 'year':
+            yield str(year), datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+            continue
+        for month in range(1, 13):
+            end = datetime.date(year + 1, 1, 1) if month == 12 else datetime.date(year, month + 1, 1)
+            yield f'{year}_{month:02}', datetime.date(year, month, 1), end
+
+
+def create_partitions_sql(table, quote_name, first_year, last_year, interval='year'):
+    """Return the SQL statements that create the partitions of ``table``."""
+    statements = [
+        f'CREATE TABLE IF NOT EXISTS {quote_name(f"{table}_default")} PARTITION OF {quote_name(table)} DEFAULT'
+    ]
+    for suffix, start, end in get_periods(first_year, last_year, interval):
+        statements.append(
+            f'CREATE TABLE IF NOT EXISTS {quote_name(f"{table}_{suffix}")} PARTITION OF {quote_name(table)} '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    return statements
+
+
+class CreateStartPartitions(Operation):
+    """Create the partitions of a table partitioned by start date - PostgreSQL only."""
+
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, model_name, first_year, last_year, interval='year'):
+        self.model_name = model_name
+        self.first_year = first_year
+        self.last_year = last_year
+        self.interval = interval
+
+    def deconstruct(self):
+        kwargs = {
+            'model_name': self.model_name,
+            'first_year': self.first_year,
+            'last_year': self.last_year,
+            'interval': self.interval,
+        }
+        return (self.__class__.__qualname__, [], kwargs)
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        for sql in create_partitions_sql(model._meta.db_table, schema_editor.quote_name,
+                                         self.first_year, self.last_year, self.interval):
+            schema_editor.execute(sql)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Dropping the partitions would delete their data.
+        pass
+
+    def describe(self):
+        return f'Create {self.interval}ly partitions {self.first_year}-{self.last_year} for {self.model_name}'
+
+    @property
+    def migration_name_fragment(self):
+        return f'{self.model_name.lower()}_partitions_{self.first_year}_{self.last_year}'
@@ -0,0 +1,60 @@
+"""
+.. _routing-label:
+
+If your site has a read replica database, minipub can send the queries for the public
+website to it, while the admin and the staff previews stay on the primary database:
+
+.. code-block:: python
+
+    DATABASES = {
+        'default': {...},
+        'replica': {...},
+    }
+
+    MINIPUB_READ_REPLICA = 'replica'
+
+The public branch of the minipub views, and the minipub sitemaps, will then read from the
+replica. You can do the same in your own code with the ``using_replica()`` queryset method:
+
+.. code-block:: python
+
+    articles = Article.objects.live().using_replica()
+
+Replicas usually lag a little behind the primary database - so for a few seconds after an
+object is saved or deleted, the public queries on its model stay on the primary database,
+and the changes can be seen straight away. This delay (in seconds) is set with
+``MINIPUB_READ_YOUR_WRITES``; it defaults to 5 seconds.
+
+Changes are tracked with the minipub :ref:`cache<caching-label>` - so on a site that runs
+several processes, it needs to be a cache that is shared between them. If the cache cannot
+tell when the last change was made (e.g. with the ``DummyCache``, or when memcached is
+down), reads stay on the primary database.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import caching
+
+
+def get_replica(model):
+    """Return the database alias to use for public reads of ``model``, or ``None`` to use the
+    normal database routing."""
+    alias = getattr(settings, 'MINIPUB_READ_REPLICA', None)
+    if alias is None:
+        return None
+    window = getattr(settings, 'MINIPUB_READ_YOUR_WRITES', 5)
+    # The cache generation is the time of the last change to the model.
+    generation = caching.get_generation(model)
+    if generation is None or time.time_ns() - generation < window * 1_000_000_000:
+        return None
+    return alias
+
+
+async def aget_replica(model):
+    """Async version of ``get_replica()`` - the cache is only read, in a thread, when a
+    replica is configured."""
+    if getattr(settings, 'MINIPUB_READ_REPLICA', None) is None:
+        return None
+    return await sync_to_async(get_replica)(model)
@@ -0,0 +1,140 @@
+"""
+.. _scheduler-label:
+
+Objects go live and expire as time passes, without being saved - so there are no model
+signals to tell you about it. The ``minipub_scheduler`` management command fills that gap:
+it sends a ``minipub_went_live`` signal for the objects that have reached their start date,
+and a ``minipub_expired`` signal for those that have passed their end date, since it last ran.
+
+Connect to the signals to purge a cache, reindex a search engine, etc.:
+
+.. code-block:: python
+
+    from django.dispatch import receiver
+    from minipub.signals import minipub_went_live
+
+    @receiver(minipub_went_live, sender=Article)
+    def reindex(sender, objects, **kwargs):
+        search_index.add(objects)
+
+The signals are sent with a list of objects, in batches (of 500 objects by default), rather
+than once per object. Each object is reported only once: the date (or time) of the last
+run of each model is stored in a JSON file, given by the ``MINIPUB_SCHEDULER_STATE`` setting:
+
+.. code-block:: python
+
+    MINIPUB_SCHEDULER_STATE = '/var/lib/mysite/minipub_scheduler.json'
+
+Without this setting, the command needs an explicit ``--since`` date.
+
+Run the command once a day, soon after midnight, from a cron job::
+
+    python manage.py minipub_scheduler
+
+or leave it running, checking for changes every few minutes::
+
+    python manage.py minipub_scheduler --loop --interval 300
+
+On its first run, the command reports the changes of the current day (or, for a
+``MinipubDateTimeModel``, of the current minute). Use ``--since`` to go further back
+(e.g. after an outage)::
+
+    python manage.py minipub_scheduler --since 2026-01-31
+"""
+import datetime
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+
+from .models import as_datetime
+from .signals import minipub_expired, minipub_went_live
+
+
+def _get_state_path():
+    path = getattr(settings, 'MINIPUB_SCHEDULER_STATE', None)
+    if not path:
+        raise ImproperlyConfigured('The MINIPUB_SCHEDULER_STATE setting is required to remember the last run; '
+                                   'or give an explicit since date.')
+    return path
+
+
+def _read_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def get_last_run(model):
+    """Return the date (or time) at which the scheduler last ran for this model, or ``None``."""
+    value = _read_state(_get_state_path()).get(model._meta.concrete_model._meta.label_lower)
+    if value is None:
+        return None
+    if isinstance(model.minipub_now(), datetime.datetime):
+        return datetime.datetime.fromisoformat(value)
+    return datetime.date.fromisoformat(value)
+
+
+def set_last_run(model, value):
+    """Record the date (or time) of the last run for this model."""
+    path = _get_state_path()
+    state = _read_state(path)
+    state[model._meta.concrete_model._meta.label_lower] = value.isoformat()
+    # Write to a temporary file first, so that the state is never left half-written.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def went_live(model, since, now, statuses=('published',)):
+    """Objects that were not live on ``since``, but are live on ``now``."""
+    return model._default_manager.filter(status__in=statuses, start__gt=since, start__lte=now).\
+        filter(Q(end__gte=now) | Q(end__isnull=True))
+
+
+def expired(model, since, now, statuses=('published',)):
+    """Objects that were live on ``since``, but are no longer live on ``now``."""
+    # Objects are still live on their end date.
+    return model._default_manager.filter(status__in=statuses, end__gte=since, end__lt=now).\
+        filter(Q(start__lte=since) | Q(start__isnull=True))
+
+
+def _send(signal, model, queryset, batch_size):
+    count = 0
+    batch = []
+    for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) == batch_size:
+            signal.send(sender=model, objects=batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        signal.send(sender=model, objects=batch)
+        count += len(batch)
+    return count
+
+
+def tick(model, statuses=('published',), since=None, batch_size=500):
+    """Send the signals for the objects that went live or expired since the last run (or
+    since the ``since`` date); return the number of objects that went live and expired.
+
+    The time of this run is recorded if ``MINIPUB_SCHEDULER_STATE`` is set.
+    """
+    now = model.minipub_now()
+    if since is None:
+        since = get_last_run(model) or now - model.minipub_resolution
+    elif isinstance(now, datetime.datetime):
+        since = as_datetime(since)
+    if since >= now:
+        return 0, 0
+    went_live_count = _send(minipub_went_live, model, went_live(model, since, now, statuses), batch_size)
+    expired_count = _send(minipub_expired, model, expired(model, since, now, statuses), batch_size)
+    if getattr(settings, 'MINIPUB_SCHEDULER_STATE', None):
+        set_last_run(model, now)
+    return went_live_count, expired_count
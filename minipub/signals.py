@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent by minipub views that use the ``InstrumentationMixin``, and by sitemaps with
+# ``minipub_instrument`` set, with the statistics recorded for the request.
+# Arguments: ``label``, ``queries``, ``sql_time``, ``total_time``, ``rows``, ``branch``.
+instrumented = Signal()
+
+# Sent by the ``minipub_scheduler`` management command, with the list of ``objects`` that
+# have gone live or expired since it last ran (in batches).
+minipub_went_live = Signal()
+minipub_expired = Signal()
@@ -37,16 +37,259 @@ the same way as you will have done for your extra views. For example:
         model = Article
         minipub_live = ('archived',)
 
+Large sitemaps
+--------------
+Items are read from the database in chunks of ``minipub_chunk_size`` objects, so
+memory use stays bounded even for a page of 50,000 urls.
+
+If your sitemap only needs a few fields to build the urls, list them in
+``minipub_only_fields`` - other fields (e.g. a large ``body``) will not be loaded:
+
+.. code-block:: python
+
+    class NewsSitemap(MinipubSitemap):
+        model = Article
+        minipub_only_fields = ('slug',)
+
+If building the urls follows relations, declare them with ``minipub_select_related`` or
+``minipub_prefetch_related``, the same way as for the
+:ref:`minipub views<related-objects-label>`:
+
+.. code-block:: python
+
+    class NewsSitemap(MinipubSitemap):
+        model = Article
+        minipub_select_related = ('category',)
+        minipub_only_fields = ('slug', 'category__slug')
+
+And once you have more than 50,000 urls (the ``limit`` of a Django sitemap), use
+Django's `sitemap index
+<https://docs.djangoproject.com/en/dev/ref/contrib/sitemaps/#creating-a-sitemap-index>`_,
+which splits the sitemap into several pages. The ``lastmod`` of each section in the
+index is computed with a single query.
+
+Pre-built sitemaps
+------------------
+Rather than building the sitemap on every request, you can write it to disk with
+the ``minipub_build_sitemaps`` management command, and serve these files with the
+``prebuilt_sitemap`` view - which does not make any database queries.
+
+In your settings, give the dotted path to your dictionary of sitemaps (the same one
+that you would pass to Django's sitemap views), and a directory to write them to:
+
+.. code-block:: python
+
+    MINIPUB_SITEMAPS = 'mysite.urls.sitemaps'
+    MINIPUB_SITEMAP_ROOT = '/var/www/sitemaps/'
+
+Then run the command regularly (e.g. every hour, from a cron job)::
+
+    python manage.py minipub_build_sitemaps
+
+Each section is written as a gzip-compressed file (one per page of the sitemap). A
+minipub section is only written again if one of its objects has changed, or gone
+live, or expired since the last run; other sitemaps are written every time. A sitemap
+index, listing every page of every section, is written too.
+
+Finally, serve the index and the sections:
+
+.. code-block:: python
+
+    from minipub.sitemaps import prebuilt_sitemap, prebuilt_sitemap_index
+
+    urlpatterns = [
+        path('sitemap.xml', prebuilt_sitemap_index),
+        path('sitemap-<slug:section>.xml', prebuilt_sitemap),
+    ]
+
+The urls in the index are those of the ``prebuilt_sitemap`` view, so it must be in your
+urls when the command runs.
+
 '''
+import datetime
+import gzip
+import json
+import os
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import QueryRecorder
+
+
+class StreamingPaginator(Paginator):
+    """A paginator that reads the objects of a page in chunks, rather than all at once."""
+
+    def __init__(self, *args, chunk_size=2000, **kwargs):
+        self.chunk_size = chunk_size
+        super().__init__(*args, **kwargs)
+
+    def _get_page(self, object_list, *args, **kwargs):
+        if hasattr(object_list, 'iterator'):
+            object_list = object_list.iterator(chunk_size=self.chunk_size)
+        return super()._get_page(object_list, *args, **kwargs)
 
 
 class MinipubSitemap(Sitemap):
 
     minipub_live = ('published',)
+    minipub_only_fields = None
+    minipub_select_related = None
+    minipub_prefetch_related = None
+    minipub_chunk_size = 2000
+    minipub_instrument = False
 
     def items(self):
-        return self.model.objects.live(statuses=self.minipub_live).order_by('-start')
+        qs = self.model.objects.live(statuses=self.minipub_live).using_replica()
+        if self.minipub_select_related:
+            qs = qs.select_related(*self.minipub_select_related)
+        if self.minipub_prefetch_related:
+            # Related objects are prefetched for each chunk.
+            qs = qs.prefetch_related(*self.minipub_prefetch_related)
+        if self.minipub_only_fields is not None:
+            qs = qs.only('modified', *self.minipub_only_fields)
+        # The pk makes the order stable between the pages of the sitemap.
+        return qs.order_by('-start', '-pk')
 
     def lastmod(self, obj):
         return obj.modified
+
+    def get_urls(self, page=1, site=None, protocol=None):
+        if not self.minipub_instrument:
+            return super().get_urls(page=page, site=site, protocol=protocol)
+        with QueryRecorder() as recorder:
+            urls = super().get_urls(page=page, site=site, protocol=protocol)
+        recorder.report(type(self), f'{type(self).__name__} page {page}', len(urls), 'public')
+        return urls
+
+    def get_latest_lastmod(self):
+        return self.items().aggregate(latest=Max('modified'))['latest']
+
+    def get_signature(self):
+        """Return a value that changes whenever the contents of this sitemap change.
+
+        The latest start date already reached, and latest end date already passed,
+        change when objects go live or expire.
+        """
+        now = self.model.minipub_now()
+        signature = self.model.objects.aggregate(
+            modified=Max('modified'),
+            status_changed=Max('status_changed'),
+            count=Count('pk'),
+            started=Max('start', filter=Q(status__in=self.minipub_live, start__lte=now)),
+            ended=Max('end', filter=Q(status__in=self.minipub_live, end__lt=now)),
+        )
+        return [str(value) for value in signature.values()] + list(self.minipub_live)
+
+    @property
+    def paginator(self):
+        return StreamingPaginator(self._items(), self.limit, chunk_size=self.minipub_chunk_size)
+
+
+def _sitemap_path(root, section, page):
+    return os.path.join(root, f'{section}-{page}.xml.gz')
+
+
+def _index_path(root):
+    return os.path.join(root, 'index.xml.gz')
+
+
+def _write_gzip(path, content):
+    # Write to a temporary file first, so that a half-written file is never served.
+    with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(f'{path}.tmp', path)
+
+
+def write_sitemaps(sitemaps, root, site=None, protocol=None, force=False):
+    """Write each section of ``sitemaps`` to the ``root`` directory.
+
+    Returns the list of sections that were written. The sitemap index is written every
+    time.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+
+    written = []
+    index = []
+    for section, sitemap in sitemaps.items():
+        if callable(sitemap):
+            sitemap = sitemap()
+        signature = sitemap.get_signature() if isinstance(sitemap, MinipubSitemap) else None
+        previous = manifest.get(section, {})
+        if force or signature is None or previous.get('signature') != signature:
+            pages = sitemap.paginator.num_pages
+            for page in range(1, pages + 1):
+                content = render_to_string('sitemap.xml', {
+                    'urlset': sitemap.get_urls(page=page, site=site, protocol=protocol),
+                })
+                _write_gzip(_sitemap_path(root, section, page), content)
+            for page in range(pages + 1, previous.get('pages', 0) + 1):
+                try:
+                    os.remove(_sitemap_path(root, section, page))
+                except FileNotFoundError:
+                    # Already removed, e.g. by hand or by a run that did not finish.
+                    pass
+            lastmod = sitemap.get_latest_lastmod()
+            manifest[section] = {'signature': signature, 'pages': pages,
+                                 'lastmod': lastmod.isoformat() if lastmod else None}
+            written.append(section)
+
+        # List every page of the section in the index, whether it was written or not.
+        entry = manifest[section]
+        url = reverse(prebuilt_sitemap, kwargs={'section': section})
+        url = f'{sitemap.get_protocol(protocol)}://{sitemap.get_domain(site)}{url}'
+        lastmod = entry.get('lastmod') and datetime.datetime.fromisoformat(entry['lastmod'])
+        index.append(SitemapIndexItem(url, lastmod))
+        for page in range(2, entry['pages'] + 1):
+            index.append(SitemapIndexItem(f'{url}?p={page}', lastmod))
+    _write_gzip(_index_path(root), render_to_string('sitemap_index.xml', {'sitemaps': index}))
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return written
+
+
+def prebuilt_sitemap(request, section):
+    """Serve a sitemap section written by the ``minipub_build_sitemaps`` command.
+
+    The page number is given in the ``p`` parameter, the same as for Django's sitemap view.
+    """
+    page = request.GET.get('p', '1')
+    if not page.isdigit():
+        raise Http404('No page "%s"' % page)
+    path = _sitemap_path(settings.MINIPUB_SITEMAP_ROOT, os.path.basename(section), int(page))
+    return _serve_gzip(request, path, 'No sitemap available for section: "%s"' % section)
+
+
+def prebuilt_sitemap_index(request):
+    """Serve the sitemap index written by the ``minipub_build_sitemaps`` command."""
+    return _serve_gzip(request, _index_path(settings.MINIPUB_SITEMAP_ROOT), 'No sitemap index available')
+
+
+def _serve_gzip(request, path, not_found):
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        raise Http404(not_found)
+
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        response = HttpResponse(content, content_type='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(content), content_type='application/xml')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
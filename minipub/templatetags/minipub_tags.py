@@ -0,0 +1,58 @@
+from django import template
+
+from minipub import caching
+
+register = template.Library()
+
+
+class MinipubCacheNode(template.Node):
+
+    def __init__(self, nodelist, timeout, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(f'"minipub_cache" tag got a non-integer timeout value: {timeout!r}')
+        staff = context.get('minipub_staff_preview')
+        if staff is None:
+            # Outside of minipub views, staff previews cannot be told apart from public pages.
+            return self.nodelist.render(context)
+        key = caching.make_fragment_key(self.fragment_name, [var.resolve(context) for var in self.vary_on],
+                                        staff=staff)
+        cache = caching.get_cache()
+        value = cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, timeout)
+        return value
+
+
+@register.tag('minipub_cache')
+def do_minipub_cache(parser, token):
+    """Cache a template fragment, taking into account the publication state of minipub
+    objects::
+
+        {% minipub_cache [timeout in seconds] [fragment name] [var1] [var2] ... %}
+            .. some expensive processing ..
+        {% endminipub_cache %}
+
+    See :ref:`caching<caching-label>`.
+    """
+    nodelist = parser.parse(('endminipub_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(f"'{tokens[0]}' tag requires at least 2 arguments.")
+    return MinipubCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],  # The fragment name.
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
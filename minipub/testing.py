@@ -0,0 +1,45 @@
+"""
+Helpers for testing sites that use minipub.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+
+    def __init__(self, test_case, maximum, connection):
+        self.test_case = test_case
+        self.maximum = maximum
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        queries = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(self.captured_queries, start=1))
+        self.test_case.assertLessEqual(
+            executed, self.maximum,
+            f'{executed} queries executed, at most {self.maximum} expected\nCaptured queries were:\n{queries}')
+
+
+class QueryCountTestMixin:
+    """A ``TestCase`` mixin to check that pages run a bounded number of queries."""
+
+    def assertMaxQueries(self, maximum, func=None, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        """Same as ``assertNumQueries()``, but fails only if more than ``maximum`` queries
+        are run."""
+        context = _AssertMaxQueriesContext(self, maximum, connections[using])
+        if func is None:
+            return context
+        with context:
+            func(*args, **kwargs)
+
+    def assertPageQueries(self, url, maximum, client=None, status_code=200, using=DEFAULT_DB_ALIAS):
+        """Request a page, check its status code and that it runs at most ``maximum`` queries;
+        return the response."""
+        client = client or self.client
+        with self.assertMaxQueries(maximum, using=using):
+            response = client.get(url)
+        self.assertEqual(response.status_code, status_code)
+        return response
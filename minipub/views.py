@@ -18,26 +18,482 @@ For example, in minipub' ``views.py``, here is the source code for defining a de
     class MinipubDetailView(GetQuerysetMixin, DetailView):
         pass
 
+.. _staff-preview-label:
+
+Staff previews
+--------------
+Members of staff see the objects that are live, plus the drafts and the objects that
+are scheduled or have expired, so that they can review them. This is decided by a
+``StaffPreview`` policy object, set on the view's ``minipub_preview`` attribute; subclass
+it to change who can preview what:
+
+.. code-block:: python
+
+    from minipub.views import MinipubDetailView, StaffPreview
+
+    class EditorPreview(StaffPreview):
+        statuses = ('draft', 'review')
+
+        def applies(self, user):
+            return user.has_perm('news.change_article')
+
+    class ArticleDetailView(MinipubDetailView):
+        minipub_preview = EditorPreview()
+
+The staff set is the public live set, plus an 'overlay' of the objects that only staff
+can see. For lists that do not need to be a queryset - such as a sidebar of the latest
+articles - ``self.get_live_objects()`` takes advantage of this: the public part comes from
+the :ref:`minipub cache<caching-label>`, shared by all users, and only the overlay is
+queried for members of staff:
+
+.. code-block:: python
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['latest'] = self.get_live_objects(Article.objects.order_by('-start'), limit=5)
+        return context
+
+The two parts are merged in the order of the queryset, which must be ordered by field
+names or ``F()`` expressions; ``NULL`` values are placed the way your database places them.
+
+.. autoclass:: minipub.views.StaffPreview
+    :members:
+
+.. _related-objects-label:
+
+Related objects
+---------------
+If your templates follow relations - authors, tags, images... - declare them on the view,
+so that they are fetched along with the objects rather than with one query per object.
+Likewise, ``minipub_only_fields`` avoids loading large fields that a page does not use:
+
+.. code-block:: python
+
+    class ArticleArchiveView(MinipubArchiveIndexView):
+        minipub_select_related = ('author',)
+        minipub_prefetch_related = ('tags',)
+        minipub_only_fields = ('title', 'slug', 'author__name')
+
+These apply to both the public pages and the staff previews. With ``minipub_only_fields``,
+remember to list the fields of the related objects too; the fields used by minipub itself
+are always loaded.
+
+To check that a page does not run more queries as its content grows, use
+``minipub.testing.QueryCountTestMixin`` in your tests:
+
+.. code-block:: python
+
+    from django.test import TestCase
+    from minipub.testing import QueryCountTestMixin
+
+    class ArticleListTest(QueryCountTestMixin, TestCase):
+
+        def test_queries(self):
+            ArticleFactory.create_batch(20)
+            self.assertPageQueries('/news/', 5)
+
+Detail pages
+------------
+``MinipubDetailView`` finds the object with a single query on its slug (or pk), status,
+start and end date. On large tables, give your model an index that covers it:
+
+.. code-block:: python
+
+    class Article(MinipubModel):
+        ...
+
+        class Meta(MinipubModel.Meta):
+            indexes = MinipubModel.Meta.indexes + [
+                models.Index(fields=['slug', 'status', 'start', 'end'], name='%(app_label)s_%(class)s_slug'),
+            ]
+
+Crawlers keep requesting pages that are deleted, or not published yet. Set
+``minipub_404_timeout`` to remember these misses in the :ref:`minipub cache<caching-label>`,
+so that they get a '404 Not Found' without any database queries:
+
+.. code-block:: python
+
+    class ArticleDetailView(MinipubDetailView):
+        minipub_404_timeout = 60 * 10
+
+The cached misses are forgotten as soon as an object of the model is saved or deleted, and
+at midnight. Staff previews are never cached.
+
+Conditional GET
+---------------
+Add the ``ConditionalGetMixin`` to your views so that browsers and CDNs can revalidate
+pages cheaply - a page that has not changed gets an empty '304 Not Modified' response
+and is not rendered again:
+
+.. code-block:: python
+
+    from minipub.views import ConditionalGetMixin, MinipubDetailView
+
+    class ArticleDetailView(ConditionalGetMixin, MinipubDetailView):
+        ...
+
+.. autoclass:: minipub.views.ConditionalGetMixin
+
+Cache expiry
+------------
+Likewise, add the ``CacheControlMixin`` so that browsers and CDNs can cache the pages
+until the next time an object goes live or expires:
+
+.. code-block:: python
+
+    from minipub.views import CacheControlMixin, MinipubDetailView
+
+    class ArticleDetailView(CacheControlMixin, MinipubDetailView):
+        minipub_max_age = 60 * 60
+
+.. autoclass:: minipub.views.CacheControlMixin
+
+Keyset pagination
+-----------------
+Django's pagination uses ``OFFSET``, so the deeper the page, the slower the query. For
+long archives, add the ``KeysetPaginationMixin``: each page is fetched starting just
+after the last object of the previous page, so all pages cost the same as the first one.
+
+.. code-block:: python
+
+    from minipub.views import KeysetPaginationMixin, MinipubArchiveIndexView
+
+    class ArticleArchiveView(KeysetPaginationMixin, MinipubArchiveIndexView):
+        paginate_by = 20
+
+There are no page numbers: the template gets a ``next_cursor`` value, to use in a link
+to the next page:
+
+.. code-block:: django
+
+    {% if next_cursor %}
+        <a href="?after={{ next_cursor }}">Older articles</a>
+    {% endif %}
+
+Caching the date lists
+----------------------
+Archive views run a ``SELECT DISTINCT`` on the whole table to find out which years (or
+months...) have objects. Add the ``DateListCacheMixin`` to keep these lists in the
+:ref:`minipub cache<caching-label>` - they are invalidated whenever an object is saved
+or deleted, and at midnight:
+
+.. code-block:: python
+
+    from minipub.views import DateListCacheMixin, MinipubArchiveIndexView
+
+    class ArticleArchiveView(DateListCacheMixin, MinipubArchiveIndexView):
+        ...
+
+If you compute extra date lists yourself, use ``self.get_cached_dates(queryset, kind, order)``
+instead of ``queryset.dates(...)``.
+
+Async views
+-----------
+If you run Django under ASGI, minipub provides async versions of the archive index
+and detail views. They use Django's async ORM methods, so they do not need to be run
+in a thread, and staff members can preview objects the same way as in the other views:
+
+.. code-block:: python
+
+    from minipub.views import MinipubAsyncArchiveIndexView, MinipubAsyncDetailView
+
+    class ArticleDetailView(MinipubAsyncDetailView):
+        ...
+
+The async archive index view does not support pagination.
+
 """
 
-from django.views.generic.dates import ArchiveIndexView, YearArchiveView
+import datetime
+import hashlib
+import operator
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections
+from django.db.models import Count, F, Max, OrderBy, Q
+from django.http import Http404
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers, patch_response_headers
+from django.views.decorators.http import condition
+from django.views.generic.dates import ArchiveIndexView, YearArchiveView, timezone_today
+from django.views.generic.detail import SingleObjectMixin
 from django.views.generic import DetailView
 
+from . import caching, routing
+from .models import as_datetime
+
+
+def _sort(objects, ordering, nulls_largest=True):
+    """Sort a list of objects like the database would.
+
+    ``NULL`` is placed following ``nulls_largest`` (the ``nulls_order_largest`` feature of
+    the database), unless the ordering sets ``nulls_first`` or ``nulls_last``.
+    """
+    keys = []
+    for field in ordering:
+        if isinstance(field, str) and field != '?':
+            keys.append((field.lstrip('-'), field.startswith('-'), None))
+        elif isinstance(field, OrderBy) and isinstance(field.expression, F):
+            nulls_first = True if field.nulls_first else False if field.nulls_last else None
+            keys.append((field.expression.name, field.descending, nulls_first))
+    # Sort by the last field first: sorts are stable.
+    for name, descending, nulls_first in reversed(keys):
+        value = operator.attrgetter(name.replace('__', '.'))
+        if nulls_first is None:
+            nulls_first = nulls_largest == descending
+        # Whether ``NULL`` sorts after the other values, before the list is reversed.
+        after = nulls_first == descending
+        objects.sort(key=lambda obj: ((value(obj) is None) == after, value(obj)), reverse=descending)
+    return objects
+
+
+class StaffPreview:
+    """Which objects members of staff can see - see above."""
+
+    # The statuses that staff can see, in addition to the live statuses of the page.
+    statuses = ('draft',)
+
+    def applies(self, user):
+        """Whether this user sees the previews."""
+        return user.is_authenticated and user.is_staff
+
+    def get_queryset(self, queryset, statuses):
+        """All the objects that staff can see: the public live set and the overlay."""
+        return queryset.filter(status__in=tuple(statuses) + tuple(self.statuses))
+
+    def get_overlay(self, queryset, statuses):
+        """The objects that only staff can see."""
+        now = queryset.model.minipub_now()
+        extra = [status for status in self.statuses if status not in statuses]
+        return queryset.filter(Q(status__in=extra) | Q(Q(start__gt=now) | Q(end__lt=now), status__in=statuses))
+
+    def get_objects(self, queryset, statuses, staff=False, limit=None, timeout=DEFAULT_TIMEOUT):
+        """Return a list of the objects that the user can see, from an ordered queryset.
+
+        The public part is cached; for members of staff, the overlay is queried and merged in.
+        """
+        public = queryset.live(statuses=statuses).using_replica()[:limit]
+        key = caching.make_key(queryset.model, 'preview', tuple(statuses), public.query)
+        cache = caching.get_cache()
+        objects = cache.get(key)
+        if objects is None:
+            objects = list(public)
+            cache.set(key, objects, timeout)
+        if not staff:
+            return objects
+        overlay = list(self.get_overlay(queryset, statuses)[:limit])
+        if not overlay:
+            return objects
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        nulls_largest = connections[queryset.db].features.nulls_order_largest
+        return _sort(objects + overlay, ordering, nulls_largest)[:limit]
+
 
 class GetQuerysetMixin:
     minipub_live = ('published',)
+    minipub_preview = StaffPreview()
+    # Passed to ``select_related()``, ``prefetch_related()`` and ``only()`` - see above.
+    minipub_select_related = None
+    minipub_prefetch_related = None
+    minipub_only_fields = None
+
+    def is_staff_preview(self):
+        """Staff users can preview objects that are not live."""
+        return self.minipub_preview.applies(self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Read by the ``{% minipub_cache %}`` tag, so that previews are not cached publicly.
+        context['minipub_staff_preview'] = self.is_staff_preview()
+        return context
+
+    def load_related(self, qs):
+        """Apply the ``minipub_select_related``, ``minipub_prefetch_related`` and
+        ``minipub_only_fields`` attributes to a queryset."""
+        if self.minipub_select_related:
+            qs = qs.select_related(*self.minipub_select_related)
+        if self.minipub_prefetch_related:
+            qs = qs.prefetch_related(*self.minipub_prefetch_related)
+        if self.minipub_only_fields is not None:
+            # The fields used by minipub itself, e.g. for ``staff_preview`` and ``live()``.
+            qs = qs.only('status', 'start', 'end', 'modified', *self.minipub_only_fields)
+        return qs
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        qs = self.load_related(super().get_queryset())
         # Staff users are a special case - we want them to be able to see an article
         # (most) of the time, so that they can review it before it goes live.
         # The exception is when an article can have extra statuses - e.g. draft, published,
         # archived. In this case, we only want the show the status that is applicable to
         # this page, *plus* the draft status.
-        if self.request.user.is_authenticated and self.request.user.is_staff:
-            staff_statuses = self.minipub_live + (self.model.STATUS.draft,)
-            return qs.filter(status__in=staff_statuses)
-        return qs.live(statuses=self.minipub_live)
+        if self.is_staff_preview():
+            return self.minipub_preview.get_queryset(qs, self.minipub_live)
+        return self.using_replica(qs.live(statuses=self.minipub_live))
+
+    def using_replica(self, qs):
+        """Send the public queries to the replica - see :ref:`database routing<routing-label>`."""
+        return qs.using_replica()
+
+    def get_live_objects(self, queryset=None, limit=None):
+        """Return a list of the objects that the user can see - see
+        :ref:`staff previews<staff-preview-label>`."""
+        if queryset is None:
+            queryset = self.model._default_manager.all()
+        queryset = self.load_related(queryset)
+        return self.minipub_preview.get_objects(queryset, self.minipub_live, staff=self.is_staff_preview(),
+                                                limit=limit)
+
+
+class ConditionalGetMixin(GetQuerysetMixin):
+    """Adds ``ETag`` and ``Last-Modified`` headers to the pages seen by anonymous users,
+    and replies with a '304 Not Modified' if the page has not changed since the last visit.
+
+    The validators are computed with a single aggregate query over the live objects shown
+    on the page - they change whenever one of these objects is modified, when objects are
+    added to or removed from the page, and every day at midnight (as that is when objects
+    reach their start or end dates).
+
+    .. note::
+
+        ``Last-Modified`` cannot see objects that are no longer live, so clients that only
+        send ``If-Modified-Since`` can see a stale page until midnight. Browsers and
+        CDNs send ``If-None-Match`` when they have an ``ETag``, and the ``ETag`` does
+        take these objects into account.
+    """
+
+    def get_conditional_queryset(self):
+        """The objects displayed on this page."""
+        qs = self.get_queryset()
+        if isinstance(self, SingleObjectMixin):
+            pk = self.kwargs.get(self.pk_url_kwarg)
+            slug = self.kwargs.get(self.slug_url_kwarg)
+            if pk is not None:
+                qs = qs.filter(pk=pk)
+            if slug is not None and (pk is None or self.query_pk_and_slug):
+                qs = qs.filter(**{self.get_slug_field(): slug})
+        return qs
+
+    def get_validators(self):
+        """Return the ETag and Last-Modified values for this page."""
+        if not hasattr(self, '_validators') and getattr(self, 'is_cached_404', lambda: False)():
+            # The view will reply with a 404 without any queries.
+            self._validators = (None, None)
+        if not hasattr(self, '_validators'):
+            now = self.model.minipub_now()
+            stats = self.get_conditional_queryset().aggregate(modified=Max('modified'), count=Count('pk'))
+            since = as_datetime(now)
+            last_modified = max(stats['modified'], since) if stats['modified'] else since
+            etag = hashlib.md5(
+                f'{stats["modified"]}:{stats["count"]}:{now}:{",".join(self.minipub_live)}'.encode(),
+                usedforsecurity=False).hexdigest()
+            self._validators = (etag, last_modified)
+        return self._validators
+
+    def dispatch(self, request, *args, **kwargs):
+        # Pages seen by logged-in users can contain user-specific content (and staff see
+        # previews), so they are always rendered in full.
+        if request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        return condition(
+            etag_func=lambda *args, **kwargs: self.get_validators()[0],
+            last_modified_func=lambda *args, **kwargs: self.get_validators()[1],
+        )(super().dispatch)(request, *args, **kwargs)
+
+
+class CacheControlMixin(GetQuerysetMixin):
+    """Sets the ``Cache-Control: max-age`` and ``Expires`` headers of the pages seen by
+    anonymous users, so that they expire exactly when the next object enters or leaves
+    the live window.
+
+    ``minipub_max_age`` (in seconds) is an upper limit - changes made by your editors will
+    be seen at the latest after that delay.
+    """
+    minipub_max_age = 60 * 60 * 24
+
+    def get_cache_timeout(self):
+        timeout = self.minipub_max_age
+        boundary = self.model._default_manager.next_boundary(statuses=self.minipub_live)
+        if boundary:
+            timeout = min(timeout, int((as_datetime(boundary) - timezone.now()).total_seconds()))
+        return max(timeout, 0)
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            add_never_cache_headers(response)
+        else:
+            patch_response_headers(response, cache_timeout=self.get_cache_timeout())
+        return response
+
+
+class KeysetPaginationMixin(GetQuerysetMixin):
+    """Paginates on (date, pk) rather than with an offset - see above."""
+    date_field = 'start'
+    cursor_kwarg = 'after'
+    next_cursor = None
+
+    def make_cursor(self, obj):
+        """Return the cursor of the page after ``obj``; it can be used as is in a url."""
+        date = getattr(obj, self.date_field)
+        if isinstance(date, datetime.datetime) and timezone.is_aware(date):
+            # Avoid the '+' of '+00:00', which a query string would read as a space.
+            date = date.astimezone(datetime.timezone.utc).isoformat().replace('+00:00', 'Z')
+        elif date:
+            date = date.isoformat()
+        return f'{date or ""}.{obj.pk}'
+
+    def get_cursor_filter(self, cursor):
+        """Select the objects after the cursor, in (date DESC NULLS FIRST, pk DESC) order."""
+        try:
+            date, pk = cursor.rsplit('.', 1)
+            date = self.model._meta.get_field(self.date_field).to_python(date) if date else None
+            pk = self.model._meta.pk.to_python(pk)
+        except (ValueError, ValidationError):
+            raise Http404(f'Invalid cursor "{cursor}".')
+        if date is None:
+            return Q(**{f'{self.date_field}__isnull': True, 'pk__lt': pk}) | \
+                Q(**{f'{self.date_field}__isnull': False})
+        return Q(**{f'{self.date_field}__lt': date}) | Q(**{self.date_field: date, 'pk__lt': pk})
+
+    def paginate_queryset(self, queryset, page_size):
+        queryset = queryset.order_by(F(self.date_field).desc(nulls_first=True), '-pk')
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        if cursor:
+            queryset = queryset.filter(self.get_cursor_filter(cursor))
+        # Fetch one extra object to find out if there is a next page.
+        object_list = list(queryset[:page_size + 1])
+        if len(object_list) > page_size:
+            object_list = object_list[:page_size]
+            self.next_cursor = self.make_cursor(object_list[-1])
+        return (None, None, object_list, bool(cursor or self.next_cursor))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
+
+
+class DateListCacheMixin(GetQuerysetMixin):
+    """Caches the date lists of archive views - see above."""
+
+    def get_cached_dates(self, queryset, kind, order='ASC'):
+        key = caching.make_key(self.model, 'dates', kind, order, queryset.query)
+        cache = caching.get_cache()
+        dates = cache.get(key)
+        if dates is None:
+            if self.uses_datetime_field:
+                dates = list(queryset.datetimes(self.get_date_field(), kind, order))
+            else:
+                dates = list(queryset.dates(self.get_date_field(), kind, order))
+            cache.set(key, dates)
+        return dates
+
+    def get_date_list(self, queryset, date_type=None, ordering='ASC'):
+        date_list = self.get_cached_dates(queryset, date_type or self.get_date_list_period(), ordering)
+        if not date_list and not self.get_allow_empty():
+            raise Http404(f'No {queryset.model._meta.verbose_name_plural} available')
+        return date_list
 
 
 class MinipubArchiveIndexView(GetQuerysetMixin, ArchiveIndexView):
@@ -49,4 +505,107 @@ class MinipubYearArchiveView(GetQuerysetMixin, YearArchiveView):
 
 
 class MinipubDetailView(GetQuerysetMixin, DetailView):
-    pass
+    # Set to a number of seconds to cache the pages that are not found - see above.
+    minipub_404_timeout = None
+
+    def get_404_key(self):
+        return caching.make_key(self.model, '404', tuple(self.minipub_live), sorted(self.kwargs.items()))
+
+    def is_cached_404(self):
+        """Whether this page is known not to exist."""
+        if not self.minipub_404_timeout or self.is_staff_preview():
+            return False
+        return caching.get_cache().get(self.get_404_key()) is not None
+
+    def get_object(self, queryset=None):
+        if self.is_cached_404():
+            raise Http404(f'No {self.model._meta.verbose_name} found matching the query.')
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            if self.minipub_404_timeout and not self.is_staff_preview():
+                caching.get_cache().set(self.get_404_key(), True, self.minipub_404_timeout)
+            raise
+
+
+class AsyncGetQuerysetMixin(GetQuerysetMixin):
+    """Async views cannot read ``request.user``, nor the cache that decides on the replica - so
+    ``aget_queryset()`` loads them first."""
+    _staff_preview = False
+    _replica = None
+
+    async def aget_queryset(self):
+        user = await self.request.auser()
+        self._staff_preview = self.minipub_preview.applies(user)
+        if not self._staff_preview:
+            self._replica = await routing.aget_replica(self.model)
+        # Building the queryset does not run any queries.
+        return self.get_queryset()
+
+    def is_staff_preview(self):
+        return self._staff_preview
+
+    def using_replica(self, qs):
+        return qs.using(self._replica) if self._replica else qs
+
+
+class MinipubAsyncArchiveIndexView(AsyncGetQuerysetMixin, ArchiveIndexView):
+    date_field = 'start'
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.aget_queryset()
+        if self.get_paginate_by(queryset):
+            raise ImproperlyConfigured('MinipubAsyncArchiveIndexView does not support pagination.')
+        date_field = self.get_date_field()
+        if not self.get_allow_future():
+            now = timezone.now() if self.uses_datetime_field else timezone_today()
+            queryset = queryset.filter(**{f'{date_field}__lte': now})
+
+        if self.uses_datetime_field:
+            dates = queryset.datetimes(date_field, self.get_date_list_period(), 'DESC')
+        else:
+            dates = queryset.dates(date_field, self.get_date_list_period(), 'DESC')
+        self.date_list = [date async for date in dates]
+        if not self.date_list and not self.get_allow_empty():
+            raise Http404(f'No {queryset.model._meta.verbose_name_plural} available')
+
+        self.object_list = [obj async for obj in queryset.order_by(*self.get_ordering())] if self.date_list else []
+        context = self.get_context_data(object_list=self.object_list, date_list=self.date_list)
+        return self.render_to_response(context)
+
+    def get_ordering(self):
+        ordering = super().get_ordering()
+        return (ordering,) if isinstance(ordering, str) else ordering
+
+    def get_template_names(self):
+        # The object list is not a queryset, so Django cannot work out the template name from it.
+        if self.template_name:
+            return [self.template_name]
+        opts = self.model._meta
+        return [f'{opts.app_label}/{opts.model_name}{self.template_name_suffix}.html']
+
+
+class MinipubAsyncDetailView(AsyncGetQuerysetMixin, DetailView):
+
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+    async def aget_object(self):
+        """Same as ``get_object()``, using the async ORM."""
+        queryset = await self.aget_queryset()
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        slug = self.kwargs.get(self.slug_url_kwarg)
+        if pk is not None:
+            queryset = queryset.filter(pk=pk)
+        if slug is not None and (pk is None or self.query_pk_and_slug):
+            queryset = queryset.filter(**{self.get_slug_field(): slug})
+        if pk is None and slug is None:
+            raise AttributeError(
+                f'Generic detail view {self.__class__.__name__} must be called with either an object '
+                f'pk or a slug in the URLconf.')
+        try:
+            return await queryset.aget()
+        except queryset.model.DoesNotExist:
+            raise Http404(f'No {queryset.model._meta.verbose_name} found matching the query')